@@ -1,19 +1,35 @@
+from __future__ import annotations
+
+import datetime
+import importlib.util
+from typing import TYPE_CHECKING, Optional, Tuple
+
+import pandas as pd
 import streamlit as st
 
 from src.data import (
     get_country_data,
+    get_data_version,
     get_delta_confirmed,
+    get_forecast_data,
     get_heatmap_data,
     get_interval_data,
+    get_rollup_cube,
+    get_similarity_index,
+    get_table_page,
     get_time_series_cases,
     get_world_source,
 )
 from src.plots import (
+    ALIGNMENT_TO_TITLE,
     COLUMN_TO_TITLE,
+    HEATMAP_COLUMN_TO_TITLE,
+    ROLLING_WINDOW_TO_TITLE,
     create_delta_barplots,
     create_heatmap,
     create_map_plot,
     create_multiselect_line_plot,
+    create_rt_plot,
     create_top_n_barplot,
     create_trajectory_plot,
     create_world_areaplot,
@@ -23,7 +39,9 @@ from src.text import (
     create_country_cases_intro,
     create_country_deltas_intro,
     create_country_intros,
+    create_country_rt_intro,
     create_country_trajectory_intro,
+    create_download_link,
     create_geo_intro,
     create_heatmap_intro,
     create_heatmap_text,
@@ -33,14 +51,160 @@ from src.text import (
     create_sidebar_intro,
     create_world_text_intro,
 )
+from src.cache import format_stats
+from src.timing import DEBUG, format_timings, memoize, reset_timings, submit
+
+if TYPE_CHECKING:
+    import altair as alt
+
+# Default columns and page sizes of the data table on the Countries page
+TABLE_COLUMNS = [
+    "country_region",
+    "date",
+    "confirmed",
+    "delta_confirmed",
+    "deaths",
+    "delta_deaths",
+    "recovered",
+]
+PAGE_SIZES = [25, 50, 100]
+# Formats the data table can be downloaded as. Parquet requires pyarrow, which is
+# looked up without importing it, so that it does not slow down start up.
+DOWNLOAD_FORMATS = ["csv"] + (
+    ["parquet"] if importlib.util.find_spec("pyarrow") else []
+)
+
+# Page sections are memoized on their own inputs only, so that toggling one widget
+# does not rebuild the other sections of the page.
+
+
+@memoize
+def load_data(version: str) -> Tuple:
+    """Return time series, world summary, rollup cube and country intros for data
+    `version`."""
+    time_source = get_time_series_cases(version=version)
+    delta_confirmed = get_delta_confirmed(time_source)
+    world_source = get_world_source(delta_confirmed, version=version)
+    cube = get_rollup_cube(time_source, world_source, version=version)
+    country_intros = create_country_intros(world_source)
+    return time_source, world_source, cube, country_intros
+
+
+@memoize
+def load_interval(
+    version: str, country: str, start: datetime.date, end: datetime.date
+) -> pd.DataFrame:
+    """Return time series of `country` in interval [`start`, `end`]."""
+    time_source, _, _, _ = load_data(version)
+    country_data, _, _ = get_country_data(time_source, country)
+    return get_interval_data(country_data=country_data, start=start, end=end)
+
+
+@memoize
+def load_sorted_interval(
+    version: str,
+    country: str,
+    start: datetime.date,
+    end: datetime.date,
+    sort_by: str,
+    descending: bool,
+) -> pd.DataFrame:
+    """Return time series of `country` in interval [`start`, `end`], sorted."""
+    interval_data = load_interval(version, country, start, end)
+    return interval_data.sort_values(sort_by, ascending=not descending, kind="stable")
+
+
+@memoize
+def interval_download_link(
+    version: str, country: str, start: datetime.date, end: datetime.date, fmt: str
+) -> str:
+    """Return link to download time series of `country` in interval [`start`,
+    `end`] as CSV or Parquet."""
+    interval_data = load_interval(version, country, start, end)
+    filename = f"{country}_{start}_{end}.{fmt}".replace(" ", "_")
+    if fmt == "parquet":
+        content = interval_data.to_parquet(index=False)
+        return create_download_link(content, filename, "application/octet-stream")
+    content = interval_data.to_csv(index=False).encode()
+    return create_download_link(content, filename, "text/csv")
+
+
+@memoize
+def country_map_section(version: str, country: str) -> alt.Chart:
+    """Return map showing position of `country`."""
+    _, world_source, _, _ = load_data(version)
+    return create_map_plot(world_source, column="confirmed", country=country)
+
+
+@memoize
+def load_forecast(version: str, countries: Tuple[str, ...]) -> pd.DataFrame:
+    """Return 14-day projection of `countries`."""
+    time_source, _, _, _ = load_data(version)
+    forecast = get_forecast_data(time_source)
+    return forecast[forecast["country_region"].isin(countries)]
+
+
+@memoize
+def country_cases_section(
+    version: str,
+    country: str,
+    start: datetime.date,
+    end: datetime.date,
+    countries: Tuple[str, ...],
+    log: bool,
+    x: str = "date",
+    projection: bool = False,
+) -> alt.Chart:
+    """Return line plot of `country` compared with `countries`."""
+    interval_data = [
+        load_interval(version, c, start, end) for c in (country,) + countries
+    ]
+    return create_multiselect_line_plot(
+        interval_data=pd.concat(interval_data),
+        countries=list(countries),
+        log=log,
+        max_points=600,  # Chart width in pixels
+        x=x,
+        forecast=load_forecast(version, (country,) + countries) if projection else None,
+    )
+
+
+@memoize
+def country_trajectory_section(version: str, country: str, linear: bool) -> alt.Chart:
+    """Return infection trajectory plot of `country`."""
+    time_source, _, _, _ = load_data(version)
+    country_data, _, _ = get_country_data(time_source, country)
+    return create_trajectory_plot(country_data, linear)
+
+
+@memoize
+def country_deltas_section(
+    version: str,
+    country: str,
+    start: datetime.date,
+    end: datetime.date,
+    window: Optional[int],
+    projection: bool = False,
+) -> alt.Chart:
+    """Return barplots of daily confirmed cases and deaths in `country`."""
+    interval_data = load_interval(version, country, start, end)
+    forecast = load_forecast(version, (country,)) if projection else None
+    return create_delta_barplots(interval_data, window=window, forecast=forecast)
+
+
+@memoize
+def country_rt_section(
+    version: str, country: str, start: datetime.date, end: datetime.date
+) -> alt.Chart:
+    """Return plot of reproduction number in `country`."""
+    return create_rt_plot(load_interval(version, country, start, end))
 
 
 def main():
+    reset_timings()
+    version = get_data_version()
     with st.spinner("Loading data..."):
-        time_source = get_time_series_cases()
-        delta_confirmed = get_delta_confirmed(time_source)
-        world_source = get_world_source(delta_confirmed)
-        country_intros = create_country_intros(world_source)
+        time_source, world_source, cube, country_intros = load_data(version)
 
     st.sidebar.title("Explore")
     options = st.sidebar.radio("Navigate to", ("Home", "World", "Countries"))
@@ -59,8 +223,9 @@ def main():
         if view == "Summary":
             # World summary
             st.header("Worldwide summary statistics")
-            st.markdown(create_world_text_intro(world_source))
-            st.altair_chart(create_world_barplot(world_source))
+            st.markdown(create_world_text_intro(cube))
+            # Charts are built concurrently and shown in page order
+            charts = [(st.empty(), submit(create_world_barplot, cube))]
 
             # Map plot
             st.subheader("Geographical data")
@@ -70,19 +235,26 @@ def main():
                 list(COLUMN_TO_TITLE.keys()),
                 format_func=COLUMN_TO_TITLE.get,
             )
-            st.altair_chart(create_map_plot(world_source, column=choice))
+            charts.append(
+                (st.empty(), submit(create_map_plot, world_source, column=choice))
+            )
 
             # World time-series
             st.subheader("Number of confirmed cases by continent")
             st.markdown(create_number_confirmed_intro())
-            st.altair_chart(
-                create_world_areaplot(time_source=time_source, color="continent_name")
+            charts.append(
+                (
+                    st.empty(),
+                    submit(create_world_areaplot, cube, color="continent_name"),
+                )
             )
 
             # Most affected nations
             st.subheader("These nations are the most affected")
             st.markdown(create_most_affected_intro())
-            st.altair_chart(create_top_n_barplot(world_source))
+            charts.append((st.empty(), submit(create_top_n_barplot, world_source)))
+            for slot, chart in charts:
+                slot.altair_chart(chart.result())
 
         # World heatmap
         if view == "Infection heatmap":
@@ -95,20 +267,22 @@ def main():
             heatmap_data, initial_countries, country_options = get_heatmap_data(
                 time_source
             )
+            column = st.selectbox(
+                "Choose metric to display",
+                list(HEATMAP_COLUMN_TO_TITLE.keys()),
+                format_func=HEATMAP_COLUMN_TO_TITLE.get,
+            )
             options = st.multiselect("Select countries to display", country_options)
-            heatmap_chart = st.altair_chart(
+            selection = time_source[time_source["country_region"].isin(options)]
+            st.altair_chart(
                 create_heatmap(
-                    heatmap_data,
-                    column="scaled_delta_confirmed",
+                    pd.concat([heatmap_data, selection]),
+                    column=column,
                     width=800,
                     height=25 * (len(options) + len(initial_countries)),
                 )
             )
 
-            if len(options) > 0:
-                selection = time_source[time_source["country_region"].isin(options)]
-                heatmap_chart.add_rows(selection)
-
     # COUNTRIES -----------------------------------------------
     if options == "Countries":
 
@@ -121,63 +295,137 @@ def main():
             "By default, start date is set to date of first registered case."
         )
 
-        country_data, first_case, last_update = get_country_data(time_source, country)
+        _, first_case, last_update = get_country_data(time_source, country)
         start = st.sidebar.date_input("Start date", first_case)
         end = st.sidebar.date_input("End date", last_update)
-        interval_data = get_interval_data(
-            country_data=country_data, start=start, end=end
-        )
+        projection = st.sidebar.checkbox("Show 14-day projections")
 
         # Main page for selected country
         st.title(country)
 
-        # Map plot: Show position of country
-        st.altair_chart(
-            create_map_plot(world_source, column="confirmed", country=country)
-        )
+        # Map plot: Show position of country. Charts are built concurrently and
+        # shown in page order.
+        charts = [(st.empty(), submit(country_map_section, version, country))]
 
         # Country intro text
         st.markdown(country_intros[country])
         display = st.checkbox("Show data")
         if display:
-            st.dataframe(interval_data)
+            interval_data = load_interval(version, country, start, end)
+            columns = st.multiselect(
+                "Columns",
+                list(interval_data.columns),
+                default=[c for c in TABLE_COLUMNS if c in interval_data],
+            )
+            sort_columns = list(interval_data.columns)
+            sort_by = st.selectbox(
+                "Sort by", sort_columns, index=sort_columns.index("date")
+            )
+            descending = st.checkbox("Descending")
+            page_size = st.selectbox("Rows per page", PAGE_SIZES)
+            rows, pages = get_table_page(
+                load_sorted_interval(version, country, start, end, sort_by, descending),
+                page=st.number_input("Page", min_value=1, value=1, step=1),
+                page_size=page_size,
+                columns=columns or None,
+            )
+            st.dataframe(rows)
+            st.markdown(f"{len(interval_data)} rows in {pages} pages")
+
+            fmt = st.selectbox("Download as", [""] + DOWNLOAD_FORMATS)
+            if fmt:
+                st.markdown(
+                    interval_download_link(version, country, start, end, fmt),
+                    unsafe_allow_html=True,
+                )
 
         # Multiselect line plot: Compare country with other countries (optional)
         st.subheader("Confirmed cases since first patient")
         st.markdown(create_country_cases_intro())
+        similar = st.checkbox("Compare with countries with similar curves")
+        default = (
+            list(
+                get_similarity_index(time_source, version=version).nearest(country, k=3)
+            )
+            if similar
+            else []
+        )
         countries = st.multiselect(
-            "Compare with:", list(time_source["country_region"].unique())
+            "Compare with:",
+            list(time_source["country_region"].unique()),
+            default=default,
         )
 
         log = st.checkbox("Log scale")
-        country_line_chart = st.altair_chart(
-            create_multiselect_line_plot(
-                interval_data=interval_data, countries=countries, log=log
+        x = st.selectbox(
+            "Align countries by",
+            list(ALIGNMENT_TO_TITLE.keys()),
+            format_func=ALIGNMENT_TO_TITLE.get,
+        )
+        charts.append(
+            (
+                st.empty(),
+                submit(
+                    country_cases_section,
+                    version,
+                    country,
+                    start,
+                    end,
+                    tuple(countries),
+                    log,
+                    x,
+                    projection,
+                ),
             )
         )
 
-        if len(countries) > 0:
-            for c in countries:
-                compare_data, _, _ = get_country_data(time_source, c)
-                compare_mask = (compare_data["date"].dt.date >= start) & (
-                    compare_data["date"].dt.date <= end
-                )
-                compare_country = compare_data[compare_mask]
-                country_line_chart.add_rows(compare_country)
-
         # Infection trajectory
         st.subheader("Infection trajectory")
         st.markdown(create_country_trajectory_intro(country))
         linear = st.checkbox("Linear scale")
-        st.altair_chart(create_trajectory_plot(country_data, linear))
+        charts.append(
+            (st.empty(), submit(country_trajectory_section, version, country, linear))
+        )
 
         # Barplots: Delta confirmed and delta deaths
         st.subheader("Number of daily confirmed cases and deaths since first patient")
         st.markdown(create_country_deltas_intro(country))
-        st.altair_chart(create_delta_barplots(interval_data))
+        window = st.selectbox(
+            "Rolling average",
+            list(ROLLING_WINDOW_TO_TITLE.keys()),
+            format_func=ROLLING_WINDOW_TO_TITLE.get,
+        )
+        charts.append(
+            (
+                st.empty(),
+                submit(
+                    country_deltas_section,
+                    version,
+                    country,
+                    start,
+                    end,
+                    window,
+                    projection,
+                ),
+            )
+        )
+
+        # Reproduction number
+        st.subheader("Effective reproduction number")
+        st.markdown(create_country_rt_intro(country))
+        charts.append(
+            (st.empty(), submit(country_rt_section, version, country, start, end))
+        )
+        for slot, chart in charts:
+            slot.altair_chart(chart.result())
 
     st.sidebar.markdown(create_sidebar_intro(), unsafe_allow_html=True)
 
+    if DEBUG:
+        st.sidebar.subheader("Timings")
+        st.sidebar.markdown(format_timings())
+        st.sidebar.markdown(format_stats())
+
 
 if __name__ == "__main__":
     main()
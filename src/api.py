@@ -0,0 +1,272 @@
+import argparse
+import gzip
+import hashlib
+import io
+import json
+import os
+import threading
+from http import HTTPStatus
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Dict, NamedTuple, Optional, Tuple
+from urllib.parse import parse_qs, unquote, urlparse
+
+import pandas as pd
+
+from src.cache import CACHE, Cache, SingleFlight
+from src.data import (
+    get_country_data,
+    get_delta_confirmed,
+    get_most_affected,
+    get_time_series_cases,
+    get_world_source,
+    read_data_version,
+)
+
+try:
+    import pyarrow as pa
+except ImportError:
+    pa = None
+
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+ARROW = "application/vnd.apache.arrow.stream"
+# Bytes of serialised responses kept per data version
+RESPONSE_MAX_BYTES = int(os.environ.get("COVID19_API_CACHE_BYTES", 64 * 1024 ** 2))
+
+# Marks a response missing from the cache, as None marks a missing dataset
+_MISSING = object()
+
+# Responses serialised as soon as a new data version is loaded
+PRECOMPUTED = ["/world", "/most-affected", "/countries"]
+
+
+class Response(NamedTuple):
+    body: bytes
+    compressed: bytes
+    etag: str
+    compressed_etag: str
+    total: int
+    version: str
+
+
+class _Version:
+    """Datasets of one data version, with its cache of serialised responses."""
+
+    def __init__(self, version: str, max_bytes: int):
+        self.version = version
+        self.time_source = get_time_series_cases(version=version)
+        self.world_source = get_world_source(
+            get_delta_confirmed(self.time_source), version=version
+        )
+        self.countries = sorted(self.world_source["country_region"].unique())
+        self.responses = Cache(max_bytes=max_bytes, ttl=None)
+        self.flights = SingleFlight()
+
+    def get(self, path: str) -> Optional[pd.DataFrame]:
+        """Return DataFrame served at `path`, or None if there is none."""
+        parts = [unquote(part) for part in path.strip("/").split("/")]
+        if parts == ["world"]:
+            return self.world_source
+        if parts == ["most-affected"]:
+            return get_most_affected(self.world_source)
+        if parts == ["countries"]:
+            return pd.DataFrame({"country_region": self.countries})
+        if len(parts) == 2 and parts[0] == "countries" and parts[1] in self.countries:
+            return get_country_data(self.time_source, parts[1])[0]
+        return None
+
+    def _build(self, key: Tuple[str, str, int, int]) -> Optional[Response]:
+        """Serialise and cache response for `key`, or return None if there is none."""
+        response = self.responses.peek(key, _MISSING)
+        if response is not _MISSING:
+            return response
+        path, fmt, page, page_size = key
+        frame = self.get(path)
+        if frame is None:
+            return None
+        rows = frame.iloc[(page - 1) * page_size : page * page_size]
+        body = SERIALISERS[fmt](rows, page, page_size, len(frame))
+        tag = f"{self.version}-{hashlib.sha1(body).hexdigest()[:16]}"
+        response = Response(
+            body,
+            gzip.compress(body),
+            f'"{tag}"',
+            f'"{tag}-gzip"',
+            len(frame),
+            self.version,
+        )
+        self.responses.set(key, response)
+        return response
+
+    def response(self, key: Tuple[str, str, int, int]) -> Optional[Response]:
+        """Return cached response for `key`, built once by concurrent requests."""
+        response = self.responses.get(key, _MISSING)
+        if response is _MISSING:
+            response = self.flights.do(key, lambda: self._build(key))
+        return response
+
+
+class Datasets:
+    """Datasets served by the API, loaded and serialised once per data version.
+
+    Requests for different responses are served concurrently. A new data version
+    is loaded once, while requests for the previous version are still served, and
+    concurrent requests for the same response wait for a single build. Responses
+    are kept up to `max_bytes` per version, least recently used evicted first.
+
+    Parameters
+    ----------
+    max_bytes : int, optional
+        Byte budget of responses, by default `RESPONSE_MAX_BYTES`.
+    """
+
+    def __init__(self, max_bytes: int = RESPONSE_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self._current: Optional[_Version] = None
+        self._lock = threading.Lock()
+        self._loads = SingleFlight()
+
+    @property
+    def version(self) -> Optional[str]:
+        current = self._current
+        return None if current is None else current.version
+
+    def _load(self, version: str) -> _Version:
+        """Return datasets of `version`, with responses in `PRECOMPUTED` built."""
+        CACHE.set_version(version)
+        current = _Version(version, self.max_bytes)
+        for path in PRECOMPUTED:
+            current.response((path, "json", 1, DEFAULT_PAGE_SIZE))
+        with self._lock:
+            self._current = current
+        return current
+
+    def _get_current(self) -> _Version:
+        """Return datasets of the current data version, loading it if needed."""
+        # Read on every request, while cached results of other versions are only
+        # evicted once a new version is loaded
+        version = read_data_version()
+        with self._lock:
+            current = self._current
+        if current is None or current.version != version:
+            current = self._loads.do(version, lambda: self._load(version))
+        return current
+
+    def get(self, path: str) -> Optional[pd.DataFrame]:
+        """Return DataFrame served at `path`, or None if there is none."""
+        return self._get_current().get(path)
+
+    def response(
+        self, path: str, fmt: str, page: int, page_size: int
+    ) -> Optional[Response]:
+        """Return body, gzipped body, their ETags, total number of rows and data
+        version for a request.
+
+        Responses are cached until the data version changes.
+        """
+        key = (path.rstrip("/"), fmt, page, page_size)
+        return self._get_current().response(key)
+
+
+def _to_json(frame: pd.DataFrame, page: int, page_size: int, total: int) -> bytes:
+    """Return page of `frame` as JSON envelope with pagination metadata."""
+    records = frame.to_json(orient="records", date_format="iso")
+    meta = json.dumps({"page": page, "page_size": page_size, "total": total})
+    return f'{{"meta": {meta}, "data": {records}}}'.encode()
+
+
+def _to_arrow(frame: pd.DataFrame, page: int, page_size: int, total: int) -> bytes:
+    """Return page of `frame` as Arrow IPC stream. Pagination is sent in headers."""
+    table = pa.Table.from_pandas(frame, preserve_index=False)
+    sink = io.BytesIO()
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    return sink.getvalue()
+
+
+SERIALISERS: Dict[str, Callable] = {"json": _to_json, "arrow": _to_arrow}
+CONTENT_TYPES = {"json": "application/json", "arrow": ARROW}
+
+
+def _matches(etag: str, if_none_match: str) -> bool:
+    """Return whether `etag` matches an If-None-Match header.
+
+    Tags are compared whole and weakly, i.e. ignoring a `W/` prefix, and `*`
+    matches any tag.
+    """
+    for tag in if_none_match.split(","):
+        tag = tag.strip()
+        if tag == "*" or (tag[2:] if tag.startswith("W/") else tag) == etag:
+            return True
+    return False
+
+
+class Handler(BaseHTTPRequestHandler):
+    """Serve datasets as JSON or Arrow, with ETags, gzip and pagination.
+
+    Routes are `/world`, `/most-affected`, `/countries` and `/countries/<name>`.
+    Query parameters are `format` (json or arrow), `page` and `page_size`.
+    """
+
+    datasets = Datasets()
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        query = parse_qs(url.query)
+        try:
+            accept = self.headers.get("Accept", "")
+            fmt = query.get("format", ["arrow" if ARROW in accept else "json"])[0]
+            page = max(int(query.get("page", [1])[0]), 1)
+            page_size = int(query.get("page_size", [DEFAULT_PAGE_SIZE])[0])
+            page_size = min(max(page_size, 1), MAX_PAGE_SIZE)
+        except ValueError:
+            return self.send_error(HTTPStatus.BAD_REQUEST, "Invalid page or page_size")
+        if fmt not in SERIALISERS or (fmt == "arrow" and pa is None):
+            return self.send_error(
+                HTTPStatus.NOT_ACCEPTABLE, f"Unsupported format {fmt}"
+            )
+
+        response = self.datasets.response(url.path, fmt, page, page_size)
+        if response is None:
+            return self.send_error(HTTPStatus.NOT_FOUND)
+        # Gzipped and identity bodies are different representations, with their
+        # own ETags
+        compress = "gzip" in self.headers.get("Accept-Encoding", "")
+        body = response.compressed if compress else response.body
+        etag = response.compressed_etag if compress else response.etag
+
+        if _matches(etag, self.headers.get("If-None-Match", "")):
+            self.send_response(HTTPStatus.NOT_MODIFIED)
+            self.send_header("ETag", etag)
+            self.send_header("Vary", "Accept, Accept-Encoding")
+            return self.end_headers()
+
+        self.send_response(HTTPStatus.OK)
+        if compress:
+            self.send_header("Content-Encoding", "gzip")
+        self.send_header("Content-Type", CONTENT_TYPES[fmt])
+        self.send_header("Content-Length", str(len(body)))
+        self.send_header("ETag", etag)
+        self.send_header("Vary", "Accept, Accept-Encoding")
+        self.send_header("X-Data-Version", response.version)
+        self.send_header("X-Total-Count", str(response.total))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+def serve(host: str = "127.0.0.1", port: int = 8000) -> None:
+    """Serve the API until interrupted."""
+    server = ThreadingHTTPServer((host, port), Handler)
+    print(f"Serving on http://{host}:{port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Serve dashboard datasets over HTTP.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    args = parser.parse_args()
+    serve(args.host, args.port)
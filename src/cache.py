@@ -0,0 +1,450 @@
+import contextlib
+import functools
+import hashlib
+import os
+import pathlib
+import pickle
+import shutil
+import sys
+import tempfile
+import threading
+import time
+import weakref
+from collections import OrderedDict
+from typing import Callable, Dict, Hashable, NamedTuple, Optional
+
+import numpy as np
+import pandas as pd
+
+MAX_BYTES = int(os.environ.get("COVID19_CACHE_MAX_BYTES", 2 * 1024 ** 3))
+TTL = float(os.environ.get("COVID19_CACHE_TTL", 0)) or None
+SHARED_DIR = os.environ.get("COVID19_SHARED_CACHE_DIR")
+# Seconds after the last write before the shared entries of a data version other
+# than the current one are deleted, so that replicas switching versions at
+# different times do not delete each other's entries
+SHARED_RETENTION = float(os.environ.get("COVID19_SHARED_CACHE_RETENTION", 24 * 3600))
+FLIGHT_TIMEOUT = float(os.environ.get("COVID19_CACHE_FLIGHT_TIMEOUT", 300))
+
+_MISSING = object()
+
+
+def _hash_sources(path: pathlib.Path = pathlib.Path(__file__).parent) -> str:
+    """Return hash of the source files of the package in `path`."""
+    hasher = hashlib.sha1()
+    for source in sorted(path.glob("*.py")):
+        hasher.update(source.name.encode())
+        hasher.update(source.read_bytes())
+    return hasher.hexdigest()[:12]
+
+
+# Version of the code, part of every key shared between processes, so that values
+# pickled by a previous deploy are not loaded by code expecting another shape
+CODE_VERSION = os.environ.get("COVID19_CODE_VERSION") or _hash_sources()
+
+
+class Entry(NamedTuple):
+    value: object
+    size: int
+    created: float
+    version: Optional[str]
+
+
+def sizeof(value: object, _seen: Optional[set] = None) -> int:
+    """Return approximate number of bytes held by `value` and what it references.
+
+    DataFrames and arrays are measured by their buffers, including the Python
+    objects in object columns. Containers and plain objects are traversed.
+    """
+    _seen = set() if _seen is None else _seen
+    if id(value) in _seen:
+        return 0
+    _seen.add(id(value))
+    if isinstance(value, (pd.DataFrame, pd.Series, pd.Index)):
+        usage = value.memory_usage(deep=True)
+        return int(usage.sum() if isinstance(usage, pd.Series) else usage)
+    if isinstance(value, np.ndarray):
+        if value.dtype == object:
+            return value.nbytes + sum(sizeof(v, _seen) for v in value.ravel())
+        return value.nbytes
+    size = sys.getsizeof(value)
+    if isinstance(value, dict):
+        size += sum(sizeof(k, _seen) + sizeof(v, _seen) for k, v in value.items())
+    elif isinstance(value, (list, tuple, set, frozenset)):
+        size += sum(sizeof(v, _seen) for v in value)
+    elif hasattr(value, "__dict__"):
+        size += sizeof(vars(value), _seen)
+    return size
+
+
+# Hashes of DataFrames and Series passed as arguments, by id() of live objects
+_frame_hashes: Dict[int, bytes] = {}
+
+
+def _hash_frame(frame: pd.DataFrame) -> bytes:
+    """Return hash of contents of `frame`, computed once per object.
+
+    Cached producers return the same objects on every hit, so a frame passed on to
+    the next producer is hashed once instead of on every script run. Frames must
+    not be mutated after they are passed to a cached function.
+    """
+    key = id(frame)
+    digest = _frame_hashes.get(key)
+    if digest is None:
+        labels = frame.columns if isinstance(frame, pd.DataFrame) else frame.name
+        hasher = hashlib.sha1(repr(labels).encode())
+        hasher.update(repr(frame.dtypes).encode())
+        hasher.update(pd.util.hash_pandas_object(frame).values.tobytes())
+        digest = hasher.digest()
+        _frame_hashes[key] = digest
+        weakref.finalize(frame, _frame_hashes.pop, key, None)
+    return digest
+
+
+def _hash_arg(value: object) -> bytes:
+    """Return bytes identifying `value` as part of a cache key."""
+    if isinstance(value, (pd.DataFrame, pd.Series)):
+        return _hash_frame(value)
+    if isinstance(value, (list, tuple)):
+        return repr([_hash_arg(v) for v in value]).encode()
+    if isinstance(value, dict):
+        return repr(sorted((k, _hash_arg(v)) for k, v in value.items())).encode()
+    try:
+        return pickle.dumps(value)
+    except (pickle.PicklingError, TypeError, AttributeError):
+        return repr(value).encode()
+
+
+class SharedCache:
+    """Cache of results shared between processes, e.g. replicas of the app.
+
+    Values are stored by data version and a string key naming the function and its
+    arguments. Implementations must be safe for concurrent readers and writers in
+    several processes, and readers must never see a partially written value.
+    """
+
+    def get(self, version: str, key: str, default: object = None) -> object:
+        """Return value stored under `key` for `version`, or `default`."""
+        raise NotImplementedError
+
+    def set(self, version: str, key: str, value: object) -> None:
+        """Store `value` under `key` for `version`."""
+        raise NotImplementedError
+
+    def set_version(self, version: str) -> None:
+        """Drop values of data versions other than `version`."""
+
+
+class LocalFileCache(SharedCache):
+    """Shared cache of pickled values in a local directory.
+
+    Every value is a file `<path>/<version>/<key>.pkl`, where the directory name
+    hashes the data version and `code_version`. Values are written to a temporary
+    file in the same directory and moved into place with `os.replace()`, so that
+    processes reading concurrently see either the complete file or none. Failing
+    to read or write a file, e.g. while another process deletes its directory, is
+    a miss.
+
+    Directories of other versions are deleted once nothing was written to them for
+    `retention` seconds, as other processes may still be using them.
+
+    Parameters
+    ----------
+    path : pathlib.Path
+        Directory to store values in, shared by all processes.
+    retention : float, optional
+        Seconds to keep directories of other versions, by default
+        `SHARED_RETENTION`.
+    code_version : str, optional
+        Version of the code storing values, by default `CODE_VERSION`.
+    """
+
+    def __init__(
+        self,
+        path: pathlib.Path,
+        retention: float = SHARED_RETENTION,
+        code_version: str = CODE_VERSION,
+    ):
+        self.path = pathlib.Path(path)
+        self.retention = retention
+        self.code_version = code_version
+
+    def _file(self, version: str, key: str) -> pathlib.Path:
+        directory = f"{self.code_version}-{version}"
+        directory = hashlib.sha1(directory.encode()).hexdigest()[:16]
+        return self.path.joinpath(directory, f"{key}.pkl")
+
+    def get(self, version: str, key: str, default: object = None) -> object:
+        try:
+            with self._file(version, key).open("rb") as f:
+                return pickle.load(f)
+        except (OSError, EOFError, pickle.UnpicklingError):
+            return default
+
+    def set(self, version: str, key: str, value: object) -> None:
+        path = self._file(version, key)
+        tmp = None
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            fd, tmp = tempfile.mkstemp(dir=path.parent, suffix=".tmp")
+            with os.fdopen(fd, "wb") as f:
+                pickle.dump(value, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp, path)
+            tmp = None
+        except (OSError, pickle.PicklingError, TypeError, AttributeError):
+            # Values that cannot be pickled or written are only cached in memory
+            pass
+        finally:
+            if tmp is not None:
+                with contextlib.suppress(OSError):
+                    os.unlink(tmp)
+
+    def set_version(self, version: str) -> None:
+        current = self._file(version, "").parent
+        try:
+            directories = [d for d in self.path.iterdir() if d.is_dir()]
+        except OSError:
+            return
+        now = time.time()
+        for directory in directories:
+            try:
+                stale = now - directory.stat().st_mtime > self.retention
+            except OSError:
+                continue
+            if directory != current and stale:
+                shutil.rmtree(directory, ignore_errors=True)
+
+
+class Cache:
+    """In-memory cache bounded by size, with LRU and TTL eviction.
+
+    Entries are evicted least recently used first when their measured size adds up
+    to more than `max_bytes`, and on lookup when older than `ttl` seconds. Entries
+    are tagged with the data version that was current when they were stored, see
+    `set_version()`, and evicted once it is superseded, unless stored as not
+    versioned.
+
+    If a `shared` cache is given, values missing from memory are looked up there
+    before they are computed, and computed values are stored in both.
+
+    Parameters
+    ----------
+    max_bytes : int, optional
+        Byte budget of all entries, by default `MAX_BYTES`.
+    ttl : float, optional
+        Seconds an entry is valid for, or None for no expiry, by default `TTL`.
+    shared : SharedCache, optional
+        Cache shared with other processes, by default None.
+    """
+
+    def __init__(
+        self,
+        max_bytes: int = MAX_BYTES,
+        ttl: Optional[float] = TTL,
+        shared: Optional[SharedCache] = None,
+    ):
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.shared = shared
+        self.version: Optional[str] = None
+        self._entries: "OrderedDict[Hashable, Entry]" = OrderedDict()
+        self._lock = threading.RLock()
+        self.hits = self.misses = self.evictions = self.resident = 0
+        self.shared_hits = 0
+
+    def get(self, key: Hashable, default: object = None) -> object:
+        """Return value stored under `key`, or `default` if there is none."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if (
+                entry is not None
+                and self.ttl
+                and time.time() - entry.created > self.ttl
+            ):
+                self._evict(key)
+                entry = None
+            if entry is not None:
+                self.hits += 1
+                self._entries.move_to_end(key)
+                return entry.value
+        if self.shared is not None:
+            value = self.shared.get(self.version, key, _MISSING)
+            if value is not _MISSING:
+                self.shared_hits += 1
+                self._store(key, value, self.version)
+                return value
+        with self._lock:
+            self.misses += 1
+        return default
+
+    def peek(self, key: Hashable, default: object = None) -> object:
+        """Return value stored in memory under `key` without counting a lookup."""
+        with self._lock:
+            entry = self._entries.get(key)
+        return default if entry is None else entry.value
+
+    def set(self, key: Hashable, value: object, versioned: bool = True) -> None:
+        """Store `value` under `key`, evicting entries to stay within budget.
+
+        Entries that are not `versioned` are kept when the data version changes,
+        e.g. to update a result from the previous version, and are not shared.
+        """
+        self._store(key, value, self.version if versioned else None)
+        if self.shared is not None and versioned:
+            self.shared.set(self.version, key, value)
+
+    def _store(self, key: Hashable, value: object, version: Optional[str]) -> None:
+        entry = Entry(value, sizeof(value), time.time(), version)
+        with self._lock:
+            if key in self._entries:
+                self._evict(key)
+            self._entries[key] = entry
+            self.resident += entry.size
+            while self.resident > self.max_bytes and len(self._entries) > 1:
+                self._evict(next(iter(self._entries)))
+
+    def _evict(self, key: Hashable) -> None:
+        entry = self._entries.pop(key)
+        self.resident -= entry.size
+        self.evictions += 1
+
+    def set_version(self, version: str) -> None:
+        """Make `version` the current data version, evicting entries of others."""
+        with self._lock:
+            if version == self.version:
+                return
+            stale = [
+                k
+                for k, e in self._entries.items()
+                if e.version is not None and e.version != version
+            ]
+            for key in stale:
+                self._evict(key)
+            self.version = version
+        if self.shared is not None:
+            self.shared.set_version(version)
+
+    def clear(self) -> None:
+        """Evict every entry."""
+        with self._lock:
+            for key in list(self._entries):
+                self._evict(key)
+
+    def stats(self) -> Dict[str, int]:
+        """Return hits, misses, evictions, number of entries and resident bytes."""
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "shared_hits": self.shared_hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "entries": len(self._entries),
+                "resident_bytes": self.resident,
+            }
+
+
+class SingleFlight:
+    """Coalesce concurrent calls with the same key into a single computation.
+
+    The first caller of `do()` for a key computes the value, and callers arriving
+    while it is in flight wait for its result instead of computing it again. If the
+    computation raises, every waiting caller raises the same exception.
+
+    Parameters
+    ----------
+    timeout : float, optional
+        Seconds to wait for a computation in flight before raising `TimeoutError`,
+        by default `FLIGHT_TIMEOUT`.
+    """
+
+    def __init__(self, timeout: float = FLIGHT_TIMEOUT):
+        self.timeout = timeout
+        self.coalesced = 0
+        self._flights: Dict[Hashable, "_Flight"] = {}
+        self._lock = threading.Lock()
+
+    def do(self, key: Hashable, func: Callable[[], object]) -> object:
+        """Return result of `func()`, or of the call in flight for `key`."""
+        with self._lock:
+            flight = self._flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._flights[key] = _Flight()
+            else:
+                self.coalesced += 1
+
+        if not leader:
+            if not flight.done.wait(self.timeout):
+                raise TimeoutError(f"{key} still in flight after {self.timeout}s")
+            if flight.error is not None:
+                raise flight.error
+            return flight.result
+
+        try:
+            flight.result = func()
+        except BaseException as error:
+            flight.error = error
+            raise
+        finally:
+            with self._lock:
+                del self._flights[key]
+            flight.done.set()
+        return flight.result
+
+
+class _Flight:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result: object = None
+        self.error: Optional[BaseException] = None
+
+
+CACHE = Cache(shared=LocalFileCache(SHARED_DIR) if SHARED_DIR else None)
+FLIGHTS = SingleFlight()
+
+
+def cached(func: Callable) -> Callable:
+    """Cache results of `func` in `CACHE`, keyed on its name and arguments.
+
+    Keys are stable between processes, so results can be shared between them.
+
+    DataFrame and Series arguments are keyed by the hash of their contents. The
+    returned value is shared between callers and must not be mutated. Concurrent
+    calls with the same key are computed once, see `SingleFlight`.
+    """
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        digest = hashlib.sha1(func.__qualname__.encode())
+        for arg in args:
+            digest.update(_hash_arg(arg))
+        for name, arg in sorted(kwargs.items()):
+            digest.update(name.encode())
+            digest.update(_hash_arg(arg))
+        key = f"{func.__module__}.{func.__qualname__}-{digest.hexdigest()}"
+        result = CACHE.get(key, _MISSING)
+        if result is _MISSING:
+            result = FLIGHTS.do(key, lambda: _compute(key, func, args, kwargs))
+        return result
+
+    return wrapper
+
+
+def _compute(key: str, func: Callable, args: tuple, kwargs: dict) -> object:
+    """Return result of `func`, unless stored by a call that just completed."""
+    result = CACHE.peek(key, _MISSING)
+    if result is _MISSING:
+        result = func(*args, **kwargs)
+        CACHE.set(key, result)
+    return result
+
+
+def format_stats() -> str:
+    """Return Markdown table of cache statistics."""
+    stats = CACHE.stats()
+    stats["coalesced"] = FLIGHTS.coalesced
+    hits = stats["hits"] + stats["shared_hits"]
+    lookups = hits + stats["misses"]
+    stats["hit_rate"] = f"{hits / lookups:.0%}" if lookups else "-"
+    stats["resident_bytes"] = f"{stats['resident_bytes'] / 1024 ** 2:.1f} MiB"
+    rows = [f"| {name} | {value} |" for name, value in stats.items()]
+    return "\n".join(["| Cache | |", "| --- | ---: |"] + rows)
@@ -1,11 +1,22 @@
+import os
 import pathlib
+import re
+import sys
 import warnings
-from typing import Tuple
+from collections import OrderedDict, defaultdict
+from types import ModuleType
+from typing import Dict, Iterator, List, Optional, Tuple
 
-import janitor
 import numpy as np
 import pandas as pd
-import streamlit as st
+
+from src.cache import CACHE, cached
+from src.forecast import get_forecasts
+from src.incremental import refresh
+from src.ranking import Leaderboard
+from src.rollup import RollupCube
+from src.rt import get_time_series_rt
+from src.similarity import SimilarityIndex
 
 warnings.filterwarnings("ignore")
 
@@ -14,11 +25,167 @@ US_DATA = PATH.joinpath("cases.csv")
 CASES_WORLDWIDE = PATH.joinpath("cases_country.csv")
 TIME_SERIES = PATH.joinpath("cases_time.csv")
 CONTINENTS = PATH.joinpath("continent_mapping.csv")
+LAST_COMMIT = PATH.joinpath("last_commit.txt")
+
+ENGINE = os.environ.get("COVID19_ENGINE", "pandas")
+
+# Columns read from time series data, see `read_time_series()`
+CHUNKSIZE = 100_000
+TIME_SERIES_DTYPES = {
+    "country_region": "object",
+    "province_state": "object",
+    "iso3": "object",
+    "last_update": "object",
+    "uid": "float64",
+    "confirmed": "float64",
+    "deaths": "float64",
+    "recovered": "float64",
+    "active": "float64",
+    "delta_confirmed": "float64",
+    "delta_recovered": "float64",
+    "incident_rate": "float64",
+    "people_tested": "float64",
+    "people_hospitalized": "float64",
+}
+
+ROLLING_WINDOWS = (7, 14)
+GROWTH_PERIOD = 7
+
+# Columns counting days since a threshold was first reached, by (column, threshold,
+# per 100,000 inhabitants), e.g. days since 100th confirmed case
+ALIGNMENTS = OrderedDict(
+    [
+        ("days_since_100_cases", ("confirmed", 100, False)),
+        ("days_since_10_deaths", ("deaths", 10, False)),
+        ("days_since_1_per_100k", ("confirmed", 1, True)),
+    ]
+)
+
+# Narrowest heatmap cell, in pixels, before dates are binned into coarser buckets
+MIN_CELL_WIDTH = 4
+BUCKETS = OrderedDict([("D", "Daily"), ("W", "Weekly"), ("M", "Monthly")])
+
+# Number of colour classes of the world map
+MAP_BINS = 7
 
 
 def _to_date(x: pd.Series) -> pd.Series:
     """Return normalised DateTime series."""
-    return pd.to_datetime(x).normalize()
+    return pd.to_datetime(x).dt.normalize()
+
+
+def read_data_version(fname: pathlib.Path = LAST_COMMIT) -> str:
+    """Return hash of the upstream commit the local data was downloaded from,
+    without evicting cached results of other versions."""
+    try:
+        with fname.open("r") as f:
+            return f.read().strip()
+    except FileNotFoundError:
+        return "no commit hash"
+
+
+def get_data_version(fname: pathlib.Path = LAST_COMMIT) -> str:
+    """Return hash of the upstream commit the local data was downloaded from.
+
+    Pass the result to cached producers so that new downloads invalidate the cache.
+    Cached results of previous versions are evicted.
+    """
+    version = read_data_version(fname)
+    CACHE.set_version(version)
+    return version
+
+
+def _segment_positions(keys: pd.Series) -> np.ndarray:
+    """Return position of each row within its run of equal, contiguous `keys`."""
+    keys = keys.to_numpy()
+    index = np.arange(len(keys))
+    starts = np.ones(len(keys), dtype=bool)
+    starts[1:] = keys[1:] != keys[:-1]
+    return index - np.maximum.accumulate(np.where(starts, index, 0))
+
+
+def _segmented_rolling_mean(
+    values: np.ndarray, positions: np.ndarray, window: int
+) -> np.ndarray:
+    """Return trailing mean over `window` rows, never crossing a segment boundary.
+
+    Windows are computed as differences of a single cumulative sum, so every
+    segment is handled in the same vectorised pass. The first rows of each
+    segment are averaged over the (shorter) available history.
+    """
+    cumsum = np.concatenate(([0.0], np.cumsum(np.nan_to_num(values, nan=0.0))))
+    end = np.arange(1, len(values) + 1)
+    periods = np.minimum(positions + 1, window)
+    return (cumsum[end] - cumsum[end - periods]) / periods
+
+
+def _segmented_shift(
+    values: np.ndarray, positions: np.ndarray, periods: int
+) -> np.ndarray:
+    """Return `values` lagged by `periods` rows within each segment."""
+    shifted = np.full(len(values), np.nan)
+    valid = np.flatnonzero(positions >= periods)
+    shifted[valid] = values[valid - periods]
+    return shifted
+
+
+def _add_rolling_columns(time_series: pd.DataFrame) -> pd.DataFrame:
+    """Add smoothed and growth columns to `time_series`.
+
+    `time_series` must be sorted by country and date. Adds `delta_confirmed_7d`,
+    `delta_confirmed_14d`, `delta_deaths_7d`, `delta_deaths_14d` (rolling means),
+    `growth_rate` (week-over-week change in the 7-day mean of new cases) and
+    `doubling_time` (days for confirmed cases to double at the current weekly rate).
+    """
+    positions = _segment_positions(time_series["country_region"])
+    for column in ["delta_confirmed", "delta_deaths"]:
+        values = time_series[column].to_numpy(dtype=float)
+        for window in ROLLING_WINDOWS:
+            time_series[f"{column}_{window}d"] = _segmented_rolling_mean(
+                values, positions, window
+            )
+
+    current = time_series[f"delta_confirmed_{GROWTH_PERIOD}d"].to_numpy()
+    previous = _segmented_shift(current, positions, GROWTH_PERIOD)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        time_series["growth_rate"] = np.where(
+            previous > 0, (current - previous) / previous, np.nan
+        )
+
+    confirmed = time_series["confirmed"].to_numpy(dtype=float)
+    ratio = confirmed / _segmented_shift(confirmed, positions, GROWTH_PERIOD)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        time_series["doubling_time"] = np.where(
+            np.isfinite(ratio) & (ratio > 1),
+            GROWTH_PERIOD * np.log(2) / np.log(ratio),
+            np.nan,
+        )
+
+    return time_series
+
+
+def _add_alignment_columns(time_series: pd.DataFrame) -> pd.DataFrame:
+    """Add columns of `ALIGNMENTS` to `time_series`, which must be sorted by country
+    and date. Days before a country reaches the threshold are NaN."""
+    positions = _segment_positions(time_series["country_region"])
+    index = np.arange(len(time_series))
+    starts = np.flatnonzero(positions == 0)
+    segment = np.cumsum(positions == 0) - 1
+    days = time_series["date"].to_numpy().astype("datetime64[D]").astype(float)
+    population = time_series["population"].to_numpy(dtype=float)
+    for name, (column, threshold, per_capita) in ALIGNMENTS.items():
+        if not len(index):
+            time_series[name] = np.nan
+            continue
+        values = time_series[column].to_numpy(dtype=float)
+        if per_capita:
+            values = values / population * 10 ** 5
+        # Position of first row reaching the threshold in each segment, or len(index)
+        reached = np.where(values >= threshold, index, len(index))
+        first = np.minimum.reduceat(reached, starts)[segment]
+        aligned = days - days[np.minimum(first, len(index) - 1)]
+        time_series[name] = np.where(index >= first, aligned, np.nan)
+    return time_series
 
 
 def _get_continents(csv: pathlib.Path = CONTINENTS) -> pd.DataFrame:
@@ -34,7 +201,7 @@ def _get_continents(csv: pathlib.Path = CONTINENTS) -> pd.DataFrame:
     return continents
 
 
-@st.cache(show_spinner=False)
+@cached
 def get_delta_confirmed(time_source: pd.DataFrame) -> pd.DataFrame:
     """
     Return DataFrame of most recent delta confirmed (i.e. change in number) of
@@ -52,12 +219,12 @@ def get_delta_confirmed(time_source: pd.DataFrame) -> pd.DataFrame:
     """
     delta_confirmed = time_source.loc[
         time_source.groupby("country_region")["date"].idxmax(),
-        ["country_region", "date", "delta_confirmed"],
+        ["country_id", "country_region", "date", "delta_confirmed"],
     ].reset_index(drop=True)
     return delta_confirmed
 
 
-@st.cache(show_spinner=False)
+@cached
 def get_most_affected(world_source: pd.DataFrame, n: int = 10) -> pd.DataFrame:
     """
     Return DataFrame of top n most affected countries (as measured by number
@@ -77,12 +244,11 @@ def get_most_affected(world_source: pd.DataFrame, n: int = 10) -> pd.DataFrame:
     melted : pd.DataFrame
         DataFrame of top `n` most affected countries.
     """
+    top_n = get_leaderboard(world_source).top("confirmed", n)
     most_affected = (
-        world_source.sort_values(by="confirmed", ascending=False)
-        .head(10)
-        .select_columns(
-            ["country_region", "confirmed", "active", "recovered", "deaths"]
-        )
+        world_source.set_index("country_region")
+        .loc[top_n, ["confirmed", "active", "recovered", "deaths"]]
+        .reset_index()
     )
     most_affected["active"] = np.where(
         most_affected[["confirmed", "deaths", "recovered"]].sum(axis=1)
@@ -90,12 +256,88 @@ def get_most_affected(world_source: pd.DataFrame, n: int = 10) -> pd.DataFrame:
         most_affected["confirmed"] - most_affected[["deaths", "recovered"]].sum(axis=1),
         most_affected["active"],
     )
-    melted = most_affected.remove_columns("confirmed").melt(
+    melted = most_affected.drop(columns="confirmed").melt(
         id_vars="country_region", var_name="status", value_name="count"
     )
     return melted
 
 
+@cached
+def get_leaderboard(source: pd.DataFrame) -> Leaderboard:
+    """Return index ranking the countries in `source` by every metric.
+
+    Parameters
+    ----------
+    source : pd.DataFrame
+        DataFrame with one row per country, e.g. from `get_world_source()`.
+
+    Returns
+    -------
+    Leaderboard
+        Index supporting top-N and rank lookups for every metric in `RANKED_METRICS`.
+    """
+    return Leaderboard(source)
+
+
+@cached
+def get_latest_leaderboard(time_source: pd.DataFrame) -> Leaderboard:
+    """Return index ranking countries by every metric on the most recent date.
+
+    Parameters
+    ----------
+    time_source : pd.DataFrame
+        Time series data, resulting from `get_time_series_cases()`.
+
+    Returns
+    -------
+    Leaderboard
+        Index supporting top-N and rank lookups for every metric in `RANKED_METRICS`.
+    """
+    latest = time_source[time_source["date"] == time_source["date"].max()]
+    return Leaderboard(latest)
+
+
+@cached
+def get_similarity_index(
+    time_source: pd.DataFrame, version: Optional[str] = None
+) -> SimilarityIndex:
+    """Return index of countries by similarity of their curves since first case.
+
+    Parameters
+    ----------
+    time_source : pd.DataFrame
+        Time series data, resulting from `get_time_series_cases()`.
+    version : Optional[str], optional
+        Data version of `time_source`, from `get_data_version()`.
+
+    Returns
+    -------
+    SimilarityIndex
+        Index supporting nearest neighbour lookups of countries.
+    """
+    return SimilarityIndex(
+        _add_country_attributes(time_source, ["population"], version)
+    )
+
+
+@cached
+def get_forecast_data(time_source: pd.DataFrame) -> pd.DataFrame:
+    """Return 14-day projection of cases and deaths of every country.
+
+    Parameters
+    ----------
+    time_source : pd.DataFrame
+        Time series data, resulting from `get_time_series_cases()`.
+
+    Returns
+    -------
+    pd.DataFrame
+        Projected values and prediction intervals by country and date, see
+        `src.forecast.get_forecasts()`.
+    """
+    return get_forecasts(time_source)
+
+
 def get_country_data(time_source: pd.DataFrame, country: str) -> Tuple:
     """
     Return DataFrame of worldwide time-series statistics on confirmed cases, deaths,
@@ -121,18 +363,11 @@ def get_country_data(time_source: pd.DataFrame, country: str) -> Tuple:
     return time_data, first_case, last_update
 
 
-@st.cache(show_spinner=False)
+@cached
 def _get_worldwide_cases(csv: pathlib.Path = CASES_WORLDWIDE) -> pd.DataFrame:
     """Return DataFrame of most recent worldwide cumulative infection data."""
     # Read and perform basic cleaning
-    cases = pd.read_csv(csv)
-    cleaned = (
-        cases.clean_names()
-        .rename_column("long_", "lon")
-        .rename_column("last_update", "date")
-        .transform_column("date", _to_date)
-        .sort_values(by=["country_region", "date"])
-    )
+    cleaned = _get_engine().read_worldwide_cases(csv)
 
     # Remove rows that are not countries
     worldwide = cleaned[~cleaned["iso3"].isna()]
@@ -145,38 +380,195 @@ def _get_worldwide_cases(csv: pathlib.Path = CASES_WORLDWIDE) -> pd.DataFrame:
     return worldwide
 
 
-def _get_us_cases(time_source: pd.DataFrame) -> pd.DataFrame:
-    """Return DataFrame of aggregated US cases."""
-    us = time_source.filter_on("country_region == 'US'")
-    us_data = us[us["province_state"].isna()]
-    return us_data
+@cached
+def get_country_dimension(version: Optional[str] = None) -> pd.DataFrame:
+    """Return DataFrame with one row per country, keyed by a dense integer `country_id`.
+
+    Time series and summary tables carry only `country_id`, so country attributes
+    are looked up by position with `_take()` rather than by merging on strings.
+
+    Parameters
+    ----------
+    version : Optional[str], optional
+        Data version from `get_data_version()`. Only used as cache key.
+
+    Returns
+    -------
+    dimension : pd.DataFrame
+        DataFrame with columns `country_id`, `iso3`, `country_region`,
+        `continent_name`, `population` and `uid` (id in world topology).
+    """
+    worldwide = _get_worldwide_cases()
+    dimension = (
+        worldwide[["iso3", "country_region", "population", "uid"]]
+        .drop_duplicates(subset="iso3")
+        .merge(_get_continents(), how="left", on="iso3")
+        .reset_index(drop=True)
+    )
+    dimension.insert(0, "country_id", np.arange(len(dimension)))
+    return dimension
+
+
+def _get_country_ids(dimension: pd.DataFrame, iso3: pd.Series) -> np.ndarray:
+    """Return `country_id` of each ISO3 code, or -1 if not in `dimension`."""
+    return pd.Index(dimension["iso3"]).get_indexer(iso3)
+
 
+def _take(dimension: pd.DataFrame, column: str, country_id: np.ndarray) -> np.ndarray:
+    """Return `column` of `dimension` for each `country_id`, NaN where it is -1."""
+    values = dimension[column].to_numpy()
+    taken = values[country_id].astype(float if values.dtype.kind in "iuf" else object)
+    taken[country_id < 0] = np.nan
+    return taken
 
-@st.cache(show_spinner=False)
-def get_time_series_cases(csv: pathlib.Path = TIME_SERIES) -> pd.DataFrame:
-    """Return time-series data of worldwide infections."""
-    time_series = pd.read_csv(csv)
+
+def _add_country_attributes(
+    frame: pd.DataFrame, columns: List[str], version: Optional[str] = None
+) -> pd.DataFrame:
+    """Return `frame` with `columns` of the country dimension of data `version`,
+    looked up by its `country_id`."""
+    dimension = get_country_dimension(version=version)
+    country_id = frame["country_id"].to_numpy()
+    return frame.assign(
+        **{column: _take(dimension, column, country_id) for column in columns}
+    )
+
+
+def _read_table(path: pathlib.Path) -> pd.DataFrame:
+    """Return DataFrame read from CSV or Parquet file."""
+    if pathlib.Path(path).suffix == ".parquet":
+        return pd.read_parquet(path)
+    return pd.read_csv(path)
+
+
+def read_worldwide_cases(csv: pathlib.Path = CASES_WORLDWIDE) -> pd.DataFrame:
+    """Return cleaned worldwide summary data, read with pandas.
+
+    Parameters
+    ----------
+    csv : pathlib.Path, optional
+        Path to worldwide summary data, by default `CASES_WORLDWIDE`.
+
+    Returns
+    -------
+    cleaned : pd.DataFrame
+        Summary data with snake case column names, sorted by country and date.
+    """
+    cases = _read_table(csv)
     cleaned = (
-        time_series.clean_names()
-        .filter_on("country_region != 'US' | province_state.isna()")
-        .remove_columns(["fips", "province_state"])
-        .rename_column("report_date_string", "report_date")
-        .rename_column("last_update", "date")
-        .transform_columns(["date", "report_date"], _to_date)
+        cases.rename(columns=_clean_name)
+        .rename(columns={"long_": "lon", "last_update": "date"})
+        .assign(date=lambda df: _to_date(df["date"]))
+        .sort_values(by=["country_region", "date"])
     )
+    return cleaned
 
-    # Remove rows that are not countries
-    cleaned = cleaned[~cleaned["iso3"].isna()]
 
-    # Get population data
-    worldwide = _get_worldwide_cases()
-    merged = cleaned.merge(
-        worldwide[["iso3", "population"]], how="left", on="iso3"
-    ).merge(_get_continents(), how="left", on="iso3")
-    time_series = merged.sort_values(by=["country_region", "date"]).reset_index(
-        drop=True
+def _clean_name(name: str) -> str:
+    """Return column name in snake case, e.g. "Country_Region" to "country_region"."""
+    return re.sub(r"[^a-z0-9_]+", "_", name.strip().lower())
+
+
+def _read_chunks(
+    path: pathlib.Path, dtypes: Dict[str, str], chunksize: int
+) -> Iterator[pd.DataFrame]:
+    """Yield chunks of the columns in `dtypes` from CSV or Parquet file.
+
+    Columns are renamed to snake case, and `dtypes` is keyed by the new names.
+    """
+    path = pathlib.Path(path)
+    if path.suffix == ".parquet":
+        import pyarrow.parquet as pq
+
+        header = pq.read_schema(path).names
+    else:
+        try:
+            header = pd.read_csv(path, nrows=0).columns
+        except pd.errors.EmptyDataError:
+            return
+    names = {column: _clean_name(column) for column in header}
+    usecols = [column for column, name in names.items() if name in dtypes]
+    dtype = {column: dtypes[names[column]] for column in usecols}
+
+    if path.suffix == ".parquet":
+        chunks = [pd.read_parquet(path, columns=usecols).astype(dtype)]
+    else:
+        chunks = pd.read_csv(path, usecols=usecols, dtype=dtype, chunksize=chunksize)
+    for chunk in chunks:
+        yield chunk.rename(columns=names)
+
+
+def read_time_series(
+    csv: pathlib.Path = TIME_SERIES, chunksize: int = CHUNKSIZE
+) -> pd.DataFrame:
+    """Return cleaned time series of countries, read with pandas.
+
+    Rows for US states and rows that are not countries are removed. The file is
+    parsed `chunksize` rows at a time, only reading the columns in
+    `TIME_SERIES_DTYPES`, and rows are filtered before the next chunk is read.
+    Kept values are collected column by column, so peak memory while reading is
+    bounded by the chunk size rather than the size of the file.
+
+    Parameters
+    ----------
+    csv : pathlib.Path, optional
+        Path to time series data, by default `TIME_SERIES`.
+    chunksize : int, optional
+        Number of rows to parse at a time, by default `CHUNKSIZE`.
+
+    Returns
+    -------
+    cleaned : pd.DataFrame
+        Time series with snake case column names, in file order.
+    """
+    columns = defaultdict(list)
+    for chunk in _read_chunks(csv, TIME_SERIES_DTYPES, chunksize):
+        chunk["last_update"] = pd.to_datetime(chunk["last_update"]).dt.normalize()
+
+        # Remove US states and rows that are not countries
+        mask = (
+            (chunk["country_region"] != "US") | chunk["province_state"].isna()
+        ) & chunk["iso3"].notna()
+
+        for name in chunk.columns.drop("province_state"):
+            columns[name].append(chunk[name].to_numpy()[mask.to_numpy()])
+
+    if not columns:
+        # No chunks were read, e.g. from an empty file
+        columns = {
+            name: [np.empty(0, dtype=dtype)]
+            for name, dtype in TIME_SERIES_DTYPES.items()
+            if name != "province_state"
+        }
+        columns["last_update"] = [np.empty(0, dtype="datetime64[ns]")]
+    cleaned = pd.DataFrame(
+        {name: np.concatenate(values) for name, values in columns.items()}
     )
+    return cleaned.rename(columns={"last_update": "date"})
+
+
+def _get_engine() -> ModuleType:
+    """Return module implementing `read_time_series` and `read_worldwide_cases`.
+
+    Set by the `COVID19_ENGINE` environment variable, either "pandas" (default) or
+    "duckdb".
+    """
+    if ENGINE == "duckdb":
+        from src import duckdb_engine
+
+        return duckdb_engine
+    return sys.modules[__name__]
+
+
+def _get_us_cases(time_source: pd.DataFrame) -> pd.DataFrame:
+    """Return DataFrame of aggregated US cases."""
+    us = time_source[time_source["country_region"] == "US"]
+    us_data = us[us["province_state"].isna()]
+    return us_data
+
 
+def _add_derived_columns(time_series: pd.DataFrame) -> pd.DataFrame:
+    """Add derived columns to `time_series`, sorted by country and date."""
     # Adding columns: scaled_confirmed, delta_deaths, log_confirmed, log_delta_confirmed, mortality_rate, delta_pr_100k
     time_series["scaled_confirmed"] = time_series.groupby("country_region")[
         "confirmed"
@@ -204,11 +596,70 @@ def get_time_series_cases(csv: pathlib.Path = TIME_SERIES) -> pd.DataFrame:
         time_series["delta_confirmed"] / time_series["population"]
     ) * 10 ** 5
 
+    # Adding columns: rolling means, growth_rate, doubling_time
+    time_series = _add_rolling_columns(time_series)
+
+    # Adding columns: days since 100th case, 10th death and 1 case per 100,000
+    time_series = _add_alignment_columns(time_series)
+
+    # Adding columns: rt, rt_std
+    time_series["rt"], time_series["rt_std"] = get_time_series_rt(time_series)
+
     return time_series
 
 
-@st.cache(show_spinner=False)
-def get_world_source(delta_confirmed: pd.DataFrame) -> pd.DataFrame:
+@cached
+def get_time_series_cases(
+    csv: pathlib.Path = TIME_SERIES, version: Optional[str] = None
+) -> pd.DataFrame:
+    """Return time-series data of worldwide infections.
+
+    The raw data is read by the query engine configured by `ENGINE`.
+
+    Parameters
+    ----------
+    csv : pathlib.Path, optional
+        Path to time series data (CSV or Parquet), by default `TIME_SERIES`.
+    version : Optional[str], optional
+        Data version from `get_data_version()`. Only used as cache key.
+
+    Returns
+    -------
+    time_series : pd.DataFrame
+        Time series data sorted by country and date.
+    """
+    cleaned = _get_engine().read_time_series(csv)
+
+    # Replace ISO3 code by country key. Country attributes are looked up by key
+    # where they are used, rather than stored on every row.
+    dimension = get_country_dimension(version=version)
+    cleaned = cleaned.drop(columns="iso3").assign(
+        country_id=_get_country_ids(dimension, cleaned["iso3"])
+    )
+    time_series = cleaned.sort_values(by=["country_region", "date"]).reset_index(
+        drop=True
+    )
+
+    # Derived columns are computed per country, in parallel for large data, and
+    # only for countries whose rows changed since the previous version. The result
+    # is kept in the cache through version changes, within its budget.
+    # Population is an input of the derived columns only, and is dropped from the
+    # returned frame. The kept result must match its input for the next refresh.
+    key = f"{__name__}.get_time_series_cases-derived-{csv}"
+    derived, _ = refresh(
+        _add_country_attributes(time_series, ["population"], version),
+        _add_derived_columns,
+        CACHE.peek(key),
+    )
+    CACHE.set(key, derived, versioned=False)
+
+    return derived.frame.drop(columns="population")
+
+
+@cached
+def get_world_source(
+    delta_confirmed: pd.DataFrame, version: Optional[str] = None
+) -> pd.DataFrame:
     """
     Return DataFrame with global infection summary statistics, including a `delta_pr_100k`
     based on most recent `delta_confirmed`.
@@ -217,26 +668,108 @@ def get_world_source(delta_confirmed: pd.DataFrame) -> pd.DataFrame:
     ----------
     delta_confirmed : pd.DataFrame
         DataFrame of most recent statistics for delta_confirmed, from `get_delta_confirmed()`.
+    version : Optional[str], optional
+        Data version of `delta_confirmed`, from `get_data_version()`.
 
     Returns
     -------
     world_source : pd.DataFrame
         DataFrame of global infection summary statistics.
     """
-    worldwide = _get_worldwide_cases()
-    world_source = worldwide.merge(
-        delta_confirmed[["delta_confirmed", "country_region"]],
-        on="country_region",
-        how="left",
-    ).merge(_get_continents(), how="left", on="iso3")
+    dimension = get_country_dimension(version=version)
+    world_source = _get_worldwide_cases().reset_index(drop=True)
+    country_id = _get_country_ids(dimension, world_source["iso3"])
+    world_source["country_id"] = country_id
+    world_source["continent_name"] = _take(dimension, "continent_name", country_id)
+
+    # Scatter latest delta into an array indexed by country key, then take
+    delta_confirmed = delta_confirmed[delta_confirmed["country_id"] >= 0]
+    latest = np.full(len(dimension), np.nan)
+    latest[delta_confirmed["country_id"].to_numpy()] = delta_confirmed[
+        "delta_confirmed"
+    ].to_numpy()
+    world_source["delta_confirmed"] = latest[country_id]
 
     world_source["delta_pr_100k"] = (
         world_source["delta_confirmed"] / world_source["population"]
     ) * 10 ** 5
+    world_source["mortality_rate"] = (
+        world_source["deaths"] / world_source["population"]
+    ) * 10 ** 5
 
     return world_source
 
 
+@cached
+def get_map_bins(
+    world_source: pd.DataFrame, columns: Tuple[str, ...], bins: int = MAP_BINS
+) -> pd.DataFrame:
+    """Return quantile class of every country for each of `columns`.
+
+    Classes are numbered from 0 to `bins - 1` by increasing value, with about
+    equally many countries in each, so that skewed counts are spread over the whole
+    colour scale. Classes are merged where values are tied, e.g. many zeros.
+    Missing values are class -1.
+
+    Parameters
+    ----------
+    world_source : pd.DataFrame
+        DataFrame of global infection summary statistics, from `get_world_source()`.
+    columns : Tuple[str, ...]
+        Columns to classify.
+    bins : int, optional
+        Number of classes, by default `MAP_BINS`.
+
+    Returns
+    -------
+    pd.DataFrame
+        Column `<column>_bin` of small integers for each of `columns`, with the
+        index of `world_source`.
+    """
+    classes = pd.DataFrame(index=world_source.index)
+    for column in columns:
+        values = world_source[column].to_numpy(dtype=float)
+        finite = np.isfinite(values)
+        edges = np.unique(
+            np.quantile(values[finite], np.linspace(0, 1, bins + 1)[1:-1])
+            if finite.any()
+            else []
+        )
+        binned = np.searchsorted(edges, values, side="left").astype(np.int8)
+        binned[~finite] = -1
+        classes[f"{column}_bin"] = binned
+    return classes
+
+
+@cached
+def get_rollup_cube(
+    time_source: pd.DataFrame,
+    world_source: pd.DataFrame,
+    version: Optional[str] = None,
+) -> RollupCube:
+    """Return measures aggregated by day, week and month for countries, continents
+    and the world.
+
+    Parameters
+    ----------
+    time_source : pd.DataFrame
+        Time series data, resulting from `get_time_series_cases()`.
+    world_source : pd.DataFrame
+        Summary data, resulting from `get_world_source()`.
+    version : Optional[str], optional
+        Data version of `time_source`, from `get_data_version()`.
+
+    Returns
+    -------
+    RollupCube
+        Pre-aggregated measures and world totals for world and continent charts.
+    """
+    time_source = _add_country_attributes(
+        time_source, ["continent_name", "population"], version
+    )
+    return RollupCube(time_source, world_source)
+
+
 def get_country_summary(world_source: pd.DataFrame, country: str) -> pd.DataFrame:
     """Return DataFrame with summary statistics for a given country.
 
@@ -251,9 +784,8 @@ def get_country_summary(world_source: pd.DataFrame, country: str) -> pd.DataFram
     -------
     country_summary : pd.DataFrame
     """
-    country_summary = world_source[
-        world_source["country_region"] == country
-    ].select_columns(
+    country_summary = world_source.loc[
+        world_source["country_region"] == country,
         [
             "country_region",
             "date",
@@ -261,8 +793,8 @@ def get_country_summary(world_source: pd.DataFrame, country: str) -> pd.DataFram
             "confirmed",
             "deaths",
             "incident_rate",
-        ]
-    )
+        ],
+    ]
     return country_summary
 
 
@@ -291,7 +823,42 @@ def get_interval_data(
     return country_data[date_mask]
 
 
-@st.cache(show_spinner=False)
+def get_table_page(
+    frame: pd.DataFrame, page: int, page_size: int, columns: Optional[List[str]] = None
+) -> Tuple[pd.DataFrame, int]:
+    """Return one page of rows of `frame` and the number of pages.
+
+    Parameters
+    ----------
+    frame : pd.DataFrame
+        Table to paginate, already sorted.
+    page : int
+        Page to return, starting at 1. Pages past the last return the last page.
+    page_size : int
+        Number of rows per page.
+    columns : Optional[List[str]], optional
+        Columns to return, by default all.
+
+    Returns
+    -------
+    page, pages : Tuple
+        Rows (pd.DataFrame) of the page, and number of pages (int).
+    """
+    pages = max(-(-len(frame) // page_size), 1)
+    page = min(max(page, 1), pages)
+    rows = frame.iloc[(page - 1) * page_size : page * page_size]
+    return (rows if columns is None else rows[columns]), pages
+
+
+def _iso_week(dates: pd.Series) -> pd.Series:
+    """Return ISO week number of `dates`."""
+    # `.dt.week` is removed in pandas 2, and `.dt.isocalendar()` is new in pandas 1.1
+    if hasattr(dates.dt, "isocalendar"):
+        return dates.dt.isocalendar().week.astype("int64")
+    return dates.dt.week
+
+
+@cached
 def _get_trajectory_data(time_source: pd.DataFrame) -> pd.DataFrame:
     """Return DataFrame of top 10 countries wrt. number of confirmed cases.
 
@@ -307,18 +874,14 @@ def _get_trajectory_data(time_source: pd.DataFrame) -> pd.DataFrame:
     time_series_top_10 : pd.DataFrame
         Time series data for top 10 most affected countries.
     """
-    top_10 = (
-        time_source[time_source["date"] == time_source["date"].max()]
-        .sort_values(by="confirmed")["country_region"]
-        .tail(10)
-    )
+    top_10 = get_latest_leaderboard(time_source).top("confirmed", 10)
     time_source_top_10 = time_source[time_source["country_region"].isin(top_10)]
-    time_source_top_10["week"] = time_source_top_10["date"].dt.week
+    time_source_top_10["week"] = _iso_week(time_source_top_10["date"])
 
     return time_source_top_10
 
 
-@st.cache(show_spinner=False)
+@cached
 def get_heatmap_data(time_source: pd.DataFrame) -> Tuple:
     """Return DataFrame for use in infection heatmap plot.
 
@@ -332,15 +895,60 @@ def get_heatmap_data(time_source: pd.DataFrame) -> Tuple:
     Tuple
         Returns DataFrame, list of default countries, list of remaining countries
     """
-    top_10 = (
-        time_source[time_source["date"] == time_source["date"].max()]
-        .sort_values(by="confirmed")
-        .tail(10)["country_region"]
-        .unique()
-    )
+    top_10 = get_latest_leaderboard(time_source).top("confirmed", 10)
     top_10_time_source = time_source[time_source["country_region"].isin(top_10)]
     initial_countries = top_10_time_source["country_region"].unique()
     country_options = sorted(
         list(set(time_source["country_region"].unique()) - set(initial_countries))
     )
     return top_10_time_source, initial_countries, country_options
+
+
+def get_binned_dates(
+    time_source: pd.DataFrame, column: str, width: int
+) -> pd.DataFrame:
+    """Return mean of `column` per country in date buckets that fit `width` pixels.
+
+    Picks the finest of daily, weekly or monthly buckets for which every bucket is
+    at least `MIN_CELL_WIDTH` pixels wide.
+
+    Parameters
+    ----------
+    time_source : pd.DataFrame
+        Time series data.
+    column : str
+        Column to aggregate.
+    width : int
+        Width of chart in pixels.
+
+    Returns
+    -------
+    binned : pd.DataFrame
+        DataFrame with columns `country_region`, `date` (start of bucket), `date_end`
+        (start of next bucket), `column` and `bucket` (name of bucket size).
+    """
+    dates = time_source["date"]
+    if dates.isna().all():
+        return pd.DataFrame(
+            {
+                "country_region": pd.Series(dtype=object),
+                "date": pd.Series(dtype="datetime64[ns]"),
+                column: pd.Series(dtype=float),
+                "date_end": pd.Series(dtype="datetime64[ns]"),
+                "bucket": pd.Series(dtype=object),
+            }
+        )
+    for freq in BUCKETS:
+        periods = dates.dt.to_period(freq)
+        if (periods.max() - periods.min()).n + 1 <= width / MIN_CELL_WIDTH:
+            break
+
+    binned = (
+        time_source.assign(date=periods.dt.start_time)
+        .groupby(["country_region", "date"])[column]
+        .mean()
+        .reset_index()
+    )
+    binned["date_end"] = (binned["date"].dt.to_period(freq) + 1).dt.start_time
+    binned["bucket"] = BUCKETS[freq]
+    return binned
@@ -0,0 +1,119 @@
+import numpy as np
+import pandas as pd
+
+
+def lttb_indices(
+    x: np.ndarray, y: np.ndarray, lengths: np.ndarray, max_points: int
+) -> np.ndarray:
+    """Return mask of points kept by Largest-Triangle-Three-Buckets downsampling.
+
+    The series are stored back to back in `x` and `y`, each sorted by `x`. All
+    series are downsampled together: each bucket step is a single array operation
+    across series, so there is one Python loop per bucket rather than per series.
+
+    Parameters
+    ----------
+    x : np.ndarray
+        Concatenated x-values of all series.
+    y : np.ndarray
+        Concatenated y-values of all series.
+    lengths : np.ndarray
+        Number of points in each series.
+    max_points : int
+        Maximum number of points to keep per series. Must be at least 3.
+
+    Returns
+    -------
+    keep : np.ndarray
+        Boolean mask over the concatenated points.
+    """
+    keep = np.ones(len(x), dtype=bool)
+    offsets = np.concatenate(([0], np.cumsum(lengths)[:-1]))
+    long = np.flatnonzero(lengths > max_points)
+    if len(long) == 0:
+        return keep
+
+    # Pad long series into matrices, one row per series
+    n = lengths[long]
+    width = n.max()
+    columns = np.arange(width)
+    inside = columns < n[:, None]
+    flat = np.where(inside, offsets[long, None] + columns, 0)
+    xs = np.where(inside, x[flat], 0.0)
+    ys = np.where(inside, y[flat], 0.0)
+    cum_x = np.concatenate((np.zeros((len(long), 1)), np.cumsum(xs, axis=1)), axis=1)
+    cum_y = np.concatenate((np.zeros((len(long), 1)), np.cumsum(ys, axis=1)), axis=1)
+
+    rows = np.arange(len(long))
+    every = (n - 2) / (max_points - 2)
+    candidates = np.arange(int(np.ceil(every.max())) + 1)
+    selected = np.zeros((len(long), max_points), dtype=np.int64)
+    selected[:, -1] = n - 1
+
+    previous = np.zeros(len(long), dtype=np.int64)
+    for bucket in range(max_points - 2):
+        start = np.floor(bucket * every).astype(np.int64) + 1
+        stop = np.floor((bucket + 1) * every).astype(np.int64) + 1
+        next_stop = np.minimum(np.floor((bucket + 2) * every).astype(np.int64) + 1, n)
+        count = next_stop - stop
+        avg_x = (cum_x[rows, next_stop] - cum_x[rows, stop]) / count
+        avg_y = (cum_y[rows, next_stop] - cum_y[rows, stop]) / count
+
+        index = np.minimum(start[:, None] + candidates, width - 1)
+        prev_x = xs[rows, previous][:, None]
+        prev_y = ys[rows, previous][:, None]
+        area = np.abs(
+            (prev_x - avg_x[:, None]) * (ys[rows[:, None], index] - prev_y)
+            - (prev_x - xs[rows[:, None], index]) * (avg_y[:, None] - prev_y)
+        )
+        area[start[:, None] + candidates >= stop[:, None]] = -1
+        previous = index[rows, np.argmax(area, axis=1)]
+        selected[:, bucket + 1] = previous
+
+    keep[flat[inside]] = False
+    keep[offsets[long, None] + selected] = True
+    return keep
+
+
+def downsample(
+    frame: pd.DataFrame,
+    max_points: int,
+    x: str = "date",
+    y: str = "confirmed",
+    by: str = "country_region",
+) -> pd.DataFrame:
+    """Return `frame` with at most `max_points` rows per series, keeping peaks.
+
+    Parameters
+    ----------
+    frame : pd.DataFrame
+        Data with one series per value of `by`.
+    max_points : int
+        Maximum number of rows per series, e.g. chart width in pixels.
+    x : str, optional
+        Column to order each series by, by default "date".
+    y : str, optional
+        Column whose shape should be preserved, by default "confirmed".
+    by : str, optional
+        Column identifying each series, by default "country_region".
+
+    Returns
+    -------
+    pd.DataFrame
+        Downsampled data, sorted by `by` and `x`.
+    """
+    frame = frame.sort_values(by=[by, x])
+    if len(frame) <= max_points:
+        return frame
+
+    _, lengths = np.unique(pd.factorize(frame[by])[0], return_counts=True)
+    x_values = frame[x]
+    if pd.api.types.is_datetime64_any_dtype(x_values):
+        x_values = (x_values - x_values.min()).dt.total_seconds()
+    keep = lttb_indices(
+        x_values.to_numpy(dtype=float),
+        np.nan_to_num(frame[y].to_numpy(dtype=float), nan=0.0),
+        lengths,
+        max(max_points, 3),
+    )
+    return frame[keep]
@@ -0,0 +1,125 @@
+import pathlib
+import time
+from typing import Dict
+
+import pandas as pd
+
+from src import data
+
+try:
+    import duckdb
+except ImportError:
+    duckdb = None
+
+# Types the CSV sniffer may infer for a column
+TYPES = "['BOOLEAN', 'BIGINT', 'DOUBLE', 'VARCHAR']"
+
+
+def _scan(path: pathlib.Path) -> str:
+    """Return DuckDB table function scanning the CSV or Parquet file at `path`."""
+    path = str(path).replace("'", "''")
+    if path.endswith(".parquet"):
+        return f"read_parquet('{path}')"
+    # Dates are read as text and parsed by pandas, as the sniffer may read
+    # ambiguous dates, e.g. 03/01/2020, day first
+    return f"read_csv_auto('{path}', header=true, auto_type_candidates={TYPES})"
+
+
+def _connect() -> "duckdb.DuckDBPyConnection":
+    """Return in-memory DuckDB connection."""
+    if duckdb is None:
+        raise ImportError(
+            "The duckdb engine requires the duckdb package, "
+            "install it with `pip install duckdb`."
+        )
+    return duckdb.connect()
+
+
+def _get_columns(connection, path: pathlib.Path) -> Dict[str, str]:
+    """Return mapping from snake case column name to column name in file."""
+    columns = connection.execute(f"DESCRIBE SELECT * FROM {_scan(path)}").fetchall()
+    return {data._clean_name(column[0]): column[0] for column in columns}
+
+
+def _select(columns: Dict[str, str], renames: Dict[str, str]) -> str:
+    """Return SQL projection of `columns`, renamed by `renames`."""
+    return ", ".join(
+        f'"{raw}" AS {renames.get(name, name)}' for name, raw in columns.items()
+    )
+
+
+def _fetch(connection, query: str) -> pd.DataFrame:
+    """Return result of `query` as DataFrame, with empty columns as float."""
+    result = connection.execute(query).df()
+    empty = result.columns[result.isna().all()]
+    result[empty] = result[empty].astype(float)
+    return result
+
+
+def read_worldwide_cases(csv: pathlib.Path = data.CASES_WORLDWIDE) -> pd.DataFrame:
+    """Return cleaned worldwide summary data, read with DuckDB.
+
+    See `src.data.read_worldwide_cases()`.
+    """
+    connection = _connect()
+    columns = _get_columns(connection, csv)
+    query = f"""
+        SELECT {_select(columns, {"long_": "lon", "last_update": "date"})}
+        FROM {_scan(csv)}
+    """
+    cleaned = _fetch(connection, query)
+    cleaned["date"] = pd.to_datetime(cleaned["date"]).dt.normalize()
+    return cleaned.sort_values(by=["country_region", "date"])
+
+
+def read_time_series(csv: pathlib.Path = data.TIME_SERIES) -> pd.DataFrame:
+    """Return cleaned time series of countries, read with DuckDB.
+
+    See `src.data.read_time_series()`. Only the columns the pipeline keeps are
+    read, so `province_state` is never materialised, and the US state filter is
+    evaluated by the scan.
+    """
+    connection = _connect()
+    columns = _get_columns(connection, csv)
+    kept = [name for name in data.TIME_SERIES_DTYPES if name != "province_state"]
+    projection = _select(
+        {name: columns[name] for name in kept if name in columns},
+        {"last_update": "date"},
+    )
+
+    conditions = [
+        f"(\"{columns['country_region']}\" <> 'US' "
+        f"OR \"{columns['province_state']}\" IS NULL)",
+        f"\"{columns['iso3']}\" IS NOT NULL",
+    ]
+    query = f"""
+        SELECT {projection}
+        FROM {_scan(csv)}
+        WHERE {" AND ".join(conditions)}
+    """
+    cleaned = _fetch(connection, query)
+    cleaned["date"] = pd.to_datetime(cleaned["date"]).dt.normalize()
+    return cleaned
+
+
+def benchmark() -> Dict[str, Dict[str, float]]:
+    """Return wall time in seconds of reading the raw data, by reader and engine."""
+    readers = {
+        "worldwide": (data.read_worldwide_cases, read_worldwide_cases),
+        "time series": (data.read_time_series, read_time_series),
+    }
+    timings = {}
+    for name, engines in readers.items():
+        timings[name] = {}
+        for engine, reader in zip(["pandas", "duckdb"], engines):
+            start = time.perf_counter()
+            reader()
+            timings[name][engine] = time.perf_counter() - start
+    return timings
+
+
+if __name__ == "__main__":
+    for name, timings in benchmark().items():
+        print(
+            f"{name}: pandas {timings['pandas']:.3f}s, duckdb {timings['duckdb']:.3f}s"
+        )
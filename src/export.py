@@ -0,0 +1,319 @@
+import argparse
+import gzip
+import hashlib
+import json
+import pathlib
+import re
+from typing import Callable, Dict, List, Tuple
+
+import altair as alt
+import pandas as pd
+
+from src.cache import CODE_VERSION
+from src.data import (
+    get_country_data,
+    get_data_version,
+    get_delta_confirmed,
+    get_heatmap_data,
+    get_rollup_cube,
+    get_time_series_cases,
+    get_world_source,
+)
+from src.plots import (
+    COLUMN_TO_TITLE,
+    HEATMAP_COLUMN_TO_TITLE,
+    create_delta_barplots,
+    create_heatmap,
+    create_map_plot,
+    create_multiselect_line_plot,
+    create_rt_plot,
+    create_top_n_barplot,
+    create_trajectory_plot,
+    create_world_areaplot,
+    create_world_barplot,
+)
+from src.text import (
+    PATH as TEMPLATES,
+    create_country_cases_intro,
+    create_country_deltas_intro,
+    create_country_intros,
+    create_country_rt_intro,
+    create_country_trajectory_intro,
+    create_geo_intro,
+    create_heatmap_intro,
+    create_heatmap_text,
+    create_home_intro,
+    create_most_affected_intro,
+    create_number_confirmed_intro,
+    create_world_text_intro,
+)
+
+OUTPUT = pathlib.Path("site/")
+MANIFEST = "manifest.json"
+
+# Datasets referenced by a page, see `_split_data()`
+DATA_URL = re.compile(r'"url": "data/([^"/]+)\.json"')
+
+# A page is a list of blocks, each either Markdown text or an alt.Chart
+Page = List[Tuple[str, object]]
+
+INDEX_HTML = """<!DOCTYPE html>
+<html>
+<head>
+  <meta charset="utf-8">
+  <title>COVID-19</title>
+  <script src="https://cdn.jsdelivr.net/npm/vega@5"></script>
+  <script src="https://cdn.jsdelivr.net/npm/vega-lite@4"></script>
+  <script src="https://cdn.jsdelivr.net/npm/vega-embed@6"></script>
+  <script src="https://cdn.jsdelivr.net/npm/marked@1"></script>
+</head>
+<body style="max-width: 900px; margin: auto; font-family: sans-serif">
+  <div id="page"></div>
+  <script>
+    const page = new URLSearchParams(location.search).get("page") || "home";
+    fetch(`pages/${page}.json`).then(r => r.json()).then(blocks => {
+      const root = document.getElementById("page");
+      for (const [kind, content] of blocks) {
+        const div = root.appendChild(document.createElement("div"));
+        if (kind === "markdown") div.innerHTML = marked(content);
+        else vegaEmbed(div, content, {actions: false});
+      }
+    });
+  </script>
+</body>
+</html>
+"""
+
+
+def _slug(name: str) -> str:
+    """Return `name` as lower case file name."""
+    return re.sub(r"[^a-z0-9]+", "-", name.lower()).strip("-")
+
+
+def _fingerprint(*frames: pd.DataFrame) -> str:
+    """Return hash of the contents of `frames`, the Markdown templates and the
+    versions of the code and Altair that render them."""
+    digest = hashlib.sha1(f"{CODE_VERSION}-{alt.__version__}".encode())
+    for frame in frames:
+        digest.update(pd.util.hash_pandas_object(frame, index=False).values.tobytes())
+    for template in sorted(TEMPLATES.glob("*.md")):
+        digest.update(template.read_bytes())
+    return digest.hexdigest()
+
+
+def _split_data(spec: Dict, output: pathlib.Path) -> Dict:
+    """Move inline datasets of `spec` into compressed files and reference by URL.
+
+    Datasets are named by a hash of their contents, so data shared between charts
+    and pages is written once. Files are written as `data/<name>.json.gz`, to be
+    served as `data/<name>.json` with `Content-Encoding: gzip` (e.g. nginx
+    `gzip_static`).
+    """
+    datasets = spec.pop("datasets", {})
+    for name, values in datasets.items():
+        path = output.joinpath("data", f"{name}.json.gz")
+        if not path.exists():
+            path.parent.mkdir(parents=True, exist_ok=True)
+            path.write_bytes(gzip.compress(json.dumps(values).encode()))
+
+    def replace(node):
+        if isinstance(node, dict):
+            if set(node) == {"name"} and node["name"] in datasets:
+                return {"url": f"data/{node['name']}.json", "format": {"type": "json"}}
+            return {key: replace(value) for key, value in node.items()}
+        if isinstance(node, list):
+            return [replace(value) for value in node]
+        return node
+
+    return replace(spec)
+
+
+def _remove_stale(output: pathlib.Path, pages: List[str]) -> List[pathlib.Path]:
+    """Delete page files in `output` not in `pages`, and datasets no page references,
+    and return their paths."""
+    keep = {output.joinpath("pages", f"{name}.json") for name in pages}
+    stale = [path for path in output.glob("pages/**/*.json") if path not in keep]
+    referenced = set()
+    for path in keep:
+        if path.exists():
+            referenced.update(DATA_URL.findall(path.read_text()))
+    stale += [
+        path
+        for path in output.glob("data/*.json.gz")
+        if path.name[: -len(".json.gz")] not in referenced
+    ]
+    for path in stale:
+        path.unlink()
+    return stale
+
+
+def _world_summary(
+    time_source: pd.DataFrame, world_source: pd.DataFrame, version: str
+) -> Page:
+    """Return blocks of World: Summary page, with a map for every column."""
+    cube = get_rollup_cube(time_source, world_source, version=version)
+    page = [
+        ("markdown", "# Worldwide summary statistics"),
+        ("markdown", create_world_text_intro(cube)),
+        ("chart", create_world_barplot(cube)),
+        ("markdown", "## Geographical data"),
+        ("markdown", create_geo_intro()),
+    ]
+    for column, title in COLUMN_TO_TITLE.items():
+        page.append(("markdown", f"### {title}"))
+        page.append(("chart", create_map_plot(world_source, column=column)))
+    return page + [
+        ("markdown", "## Number of confirmed cases by continent"),
+        ("markdown", create_number_confirmed_intro()),
+        ("chart", create_world_areaplot(cube)),
+        ("markdown", "## These nations are the most affected"),
+        ("markdown", create_most_affected_intro()),
+        ("chart", create_top_n_barplot(world_source)),
+    ]
+
+
+def _world_heatmap(time_source: pd.DataFrame) -> Page:
+    """Return blocks of World: Infection heatmap page, for every metric."""
+    heatmap_data, initial_countries, _ = get_heatmap_data(time_source)
+    page = [
+        ("markdown", "# Rate of change at a glance"),
+        ("markdown", create_heatmap_intro()),
+        ("markdown", create_heatmap_text()),
+    ]
+    for column, title in HEATMAP_COLUMN_TO_TITLE.items():
+        page.append(("markdown", f"### {title}"))
+        chart = create_heatmap(
+            heatmap_data, column=column, width=800, height=25 * len(initial_countries)
+        )
+        page.append(("chart", chart))
+    return page
+
+
+def _home(countries: List[str]) -> Page:
+    """Return blocks of Home page, with links to every other page."""
+    links = ["- [World: Summary](?page=world-summary)"]
+    links.append("- [World: Infection heatmap](?page=world-heatmap)")
+    links += [f"- [{c}](?page=countries/{_slug(c)})" for c in sorted(countries)]
+    return [("markdown", create_home_intro()), ("markdown", "\n".join(links))]
+
+
+def _country(
+    country_data: pd.DataFrame, world_source: pd.DataFrame, intro: str
+) -> Page:
+    """Return blocks of Countries page for the country in `country_data`."""
+    country = country_data["country_region"].iloc[0]
+    interval_data = country_data[country_data["confirmed"] > 0]
+    return [
+        ("markdown", f"# {country}"),
+        ("chart", create_map_plot(world_source, column="confirmed", country=country)),
+        ("markdown", intro),
+        ("markdown", "## Confirmed cases since first patient"),
+        ("markdown", create_country_cases_intro()),
+        (
+            "chart",
+            create_multiselect_line_plot(
+                interval_data, countries=[], log=False, max_points=600
+            ),
+        ),
+        ("markdown", "## Infection trajectory"),
+        ("markdown", create_country_trajectory_intro(country)),
+        ("chart", create_trajectory_plot(country_data)),
+        (
+            "markdown",
+            "## Number of daily confirmed cases and deaths since first patient",
+        ),
+        ("markdown", create_country_deltas_intro(country)),
+        ("chart", create_delta_barplots(interval_data)),
+        ("markdown", "## Effective reproduction number"),
+        ("markdown", create_country_rt_intro(country)),
+        ("chart", create_rt_plot(interval_data)),
+    ]
+
+
+def export(output: pathlib.Path = OUTPUT, force: bool = False) -> Dict[str, bool]:
+    """Write static site with every page, country and map column to `output`.
+
+    Pages whose input data, templates and code are unchanged since the last export
+    are skipped, unless `force` is True. Pages of countries no longer in the data,
+    and datasets no page uses, are deleted.
+
+    Parameters
+    ----------
+    output : pathlib.Path, optional
+        Directory to write site to, by default `OUTPUT`.
+    force : bool, optional
+        Rebuild every page, by default False.
+
+    Returns
+    -------
+    Dict
+        Whether each page (key) was rebuilt (value).
+    """
+    alt.data_transformers.disable_max_rows()
+    version = get_data_version()
+    time_source = get_time_series_cases(version=version)
+    world_source = get_world_source(get_delta_confirmed(time_source), version=version)
+
+    pages: Dict[str, Tuple[str, Callable[[], Page]]] = {
+        "home": (
+            _fingerprint(world_source[["country_region"]]),
+            lambda: _home(world_source["country_region"].unique()),
+        ),
+        "world-summary": (
+            _fingerprint(time_source, world_source),
+            lambda: _world_summary(time_source, world_source, version),
+        ),
+        "world-heatmap": (
+            _fingerprint(time_source),
+            lambda: _world_heatmap(time_source),
+        ),
+    }
+    country_intros = create_country_intros(world_source)
+    # Maps of country pages are coloured by bins computed over every country
+    map_columns = world_source[list(COLUMN_TO_TITLE)]
+    for country in world_source["country_region"].unique():
+        country_data, _, _ = get_country_data(time_source, country)
+        summary = world_source[world_source["country_region"] == country]
+        pages[f"countries/{_slug(country)}"] = (
+            _fingerprint(country_data, summary, map_columns),
+            lambda c=country_data, i=country_intros[country]: _country(
+                c, world_source, i
+            ),
+        )
+
+    manifest_path = output.joinpath(MANIFEST)
+    manifest = json.loads(manifest_path.read_text()) if manifest_path.exists() else {}
+    rebuilt = {}
+    for name, (fingerprint, build) in pages.items():
+        path = output.joinpath("pages", f"{name}.json")
+        rebuilt[name] = force or manifest.get(name) != fingerprint or not path.exists()
+        if not rebuilt[name]:
+            continue
+        blocks = [
+            (
+                kind,
+                content
+                if kind == "markdown"
+                else _split_data(content.to_dict(), output),
+            )
+            for kind, content in build()
+        ]
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(json.dumps(blocks))
+        manifest[name] = fingerprint
+
+    manifest = {name: manifest[name] for name in pages}
+    _remove_stale(output, list(pages))
+
+    output.joinpath("index.html").write_text(INDEX_HTML)
+    manifest_path.write_text(json.dumps(manifest, indent=2, sort_keys=True))
+    return rebuilt
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Export dashboard as static site.")
+    parser.add_argument("--output", type=pathlib.Path, default=OUTPUT)
+    parser.add_argument("--force", action="store_true", help="Rebuild every page")
+    args = parser.parse_args()
+    rebuilt = export(args.output, force=args.force)
+    print(f"Rebuilt {sum(rebuilt.values())} of {len(rebuilt)} pages in {args.output}")
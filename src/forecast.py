@@ -0,0 +1,156 @@
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Tuple
+
+import numpy as np
+import pandas as pd
+
+from src.matrix import to_matrix
+from src.partition import MP_CONTEXT
+
+# Days projected ahead of the last date
+HORIZON = 14
+# Trailing days the growth model is fitted to, and fewest valid days to fit
+FIT_WINDOW = 21
+MIN_POINTS = 7
+# Width of projection band in standard errors, about a 95% interval
+Z = 1.96
+# Fits of at least this many regions are split across processes. A fit takes a few
+# microseconds per region, so smaller fits are faster than starting processes.
+PARALLEL_REGIONS = 50_000
+
+# Daily series projected, with the cumulative series they add up to
+FORECASTS = {"delta_confirmed": "confirmed", "delta_deaths": "deaths"}
+
+
+def fit_log_linear(
+    matrix: np.ndarray, window: int = FIT_WINDOW, horizon: int = HORIZON
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Return projection of every row of `matrix` by a log-linear growth model.
+
+    Each row, e.g. daily new cases of a region, is fitted by least squares as
+    `log(y) = a + b * t` over its last `window` columns, ignoring values that are
+    zero, negative or NaN. All rows are fitted at once with the closed-form
+    solution. Rows with fewer than `MIN_POINTS` valid values are NaN.
+
+    Parameters
+    ----------
+    matrix : np.ndarray
+        Regions × days matrix of non-cumulative values.
+    window : int, optional
+        Number of trailing days to fit, by default `FIT_WINDOW`.
+    horizon : int, optional
+        Number of days to project, by default `HORIZON`.
+
+    Returns
+    -------
+    mean, lower, upper : Tuple
+        Regions × `horizon` matrices of the projection and its prediction interval.
+    """
+    values = matrix[:, -window:]
+    mask = np.isfinite(values) & (values > 0)
+    logs = np.where(mask, np.log(np.where(mask, values, 1)), 0)
+    t = np.arange(values.shape[1], dtype=float)
+
+    with np.errstate(invalid="ignore", divide="ignore"):
+        n = mask.sum(axis=1)
+        t_mean = (mask * t).sum(axis=1) / n
+        y_mean = logs.sum(axis=1) / n
+        dt = np.where(mask, t - t_mean[:, None], 0)
+        sxx = (dt ** 2).sum(axis=1)
+        slope = (dt * logs).sum(axis=1) / sxx
+        intercept = y_mean - slope * t_mean
+        residuals = np.where(mask, logs - intercept[:, None] - slope[:, None] * t, 0)
+        sigma = np.sqrt((residuals ** 2).sum(axis=1) / (n - 2))
+
+        ahead = t[-1] + np.arange(1, horizon + 1)
+        fitted = intercept[:, None] + slope[:, None] * ahead
+        spread = (
+            Z
+            * sigma[:, None]
+            * np.sqrt(
+                1 + 1 / n[:, None] + (ahead - t_mean[:, None]) ** 2 / sxx[:, None]
+            )
+        )
+    invalid = (n < MIN_POINTS) | ~np.isfinite(slope) | ~np.isfinite(sigma)
+    fitted[invalid] = np.nan
+    return np.exp(fitted), np.exp(fitted - spread), np.exp(fitted + spread)
+
+
+def _fit_rows(matrix: np.ndarray, workers: int = None) -> Tuple[np.ndarray, ...]:
+    """Return `fit_log_linear(matrix)`, fitted in a process pool for many rows."""
+    workers = workers or os.cpu_count() or 1
+    if len(matrix) < PARALLEL_REGIONS or workers == 1:
+        return fit_log_linear(matrix)
+    # Only the fitted window is sent to the workers
+    chunks = np.array_split(matrix[:, -FIT_WINDOW:], workers)
+    with ProcessPoolExecutor(workers, mp_context=MP_CONTEXT) as executor:
+        results = list(executor.map(fit_log_linear, chunks))
+    return tuple(np.concatenate(parts) for parts in zip(*results))
+
+
+def get_forecasts(time_source: pd.DataFrame, horizon: int = HORIZON) -> pd.DataFrame:
+    """Return projection of daily and cumulative cases and deaths of every country.
+
+    Daily series are smoothed by their 7-day average before fitting. Cumulative
+    series continue from the last observed value.
+
+    Parameters
+    ----------
+    time_source : pd.DataFrame
+        Time series data, resulting from `get_time_series_cases()`.
+    horizon : int, optional
+        Number of days to project, by default `HORIZON`.
+
+    Returns
+    -------
+    pd.DataFrame
+        One row per country and projected date, with columns `<column>_forecast`,
+        `<column>_lower` and `<column>_upper` for every column in `FORECASTS` and
+        the cumulative columns they add up to. Series that could not be fitted are
+        NaN, and countries with no fitted series are left out.
+    """
+    countries = pd.unique(time_source["country_region"])
+    dates = pd.date_range(time_source["date"].max(), periods=horizon + 1)[1:]
+    forecasts = pd.DataFrame(
+        {
+            "country_region": np.repeat(countries, horizon),
+            "date": np.tile(dates, len(countries)),
+        }
+    )
+    by_country = time_source.groupby("country_region", sort=False)
+    for daily, cumulative in FORECASTS.items():
+        matrix, _, _ = to_matrix(
+            time_source["country_region"],
+            time_source["date"],
+            time_source[f"{daily}_7d"],
+        )
+        last = by_country[cumulative].last().reindex(countries).fillna(0).to_numpy()
+        for name, values in zip(["forecast", "lower", "upper"], _fit_rows(matrix)):
+            forecasts[f"{daily}_{name}"] = values.ravel()
+            forecasts[f"{cumulative}_{name}"] = (
+                last[:, None] + np.cumsum(values, axis=1)
+            ).ravel()
+    # Countries are kept if any series could be fitted, e.g. cases but not deaths
+    return forecasts.dropna(
+        subset=[f"{daily}_forecast" for daily in FORECASTS], how="all"
+    )
+
+
+def benchmark(regions: int, days: int = 365, repeat: int = 3) -> float:
+    """Return best wall time in seconds of fitting `regions` synthetic series."""
+    rng = np.random.default_rng(0)
+    growth = rng.uniform(-0.05, 0.1, size=(regions, 1))
+    matrix = rng.poisson(np.exp(np.minimum(growth * np.arange(days), 12))).astype(float)
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        _fit_rows(matrix)
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+if __name__ == "__main__":
+    for regions in (200, 3000, 100_000):
+        print(f"forecast, {regions} regions x 365 days: {benchmark(regions):.3f}s")
@@ -0,0 +1,156 @@
+import time
+from typing import Callable, Dict, List, NamedTuple, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from src.partition import run_partitioned
+
+
+class Derived(NamedTuple):
+    """Result of a function applied per key, with the segments of the input it was
+    computed from."""
+
+    segments: pd.DataFrame
+    columns: Tuple[str, ...]
+    frame: pd.DataFrame
+
+
+def segment_hashes(frame: pd.DataFrame, key: str = "country_region") -> pd.DataFrame:
+    """Return hash, first row and number of rows of every key in `frame`, which
+    must be sorted by key.
+
+    Rows are hashed with `pd.util.hash_pandas_object`, and the hashes of the rows of
+    a key are summed, so a key's hash changes if any of its rows is added, removed
+    or revised. Rows must be unique within a key, e.g. by date.
+    """
+    keys = frame[key].to_numpy()
+    starts = np.flatnonzero(np.r_[True, keys[1:] != keys[:-1]]) if len(keys) else []
+    # The key is implied by the segment, and is the most costly column to hash
+    rows = pd.util.hash_pandas_object(frame.drop(columns=key), index=False)
+    return pd.DataFrame(
+        {
+            "hash": np.add.reduceat(rows.to_numpy(), starts)
+            if len(starts)
+            else np.empty(0, dtype="uint64"),
+            "start": starts,
+            "length": np.diff(np.r_[starts, len(keys)]).astype(int),
+        },
+        index=pd.Index(keys[starts], name=key),
+    )
+
+
+def refresh(
+    frame: pd.DataFrame,
+    func: Callable[[pd.DataFrame], pd.DataFrame],
+    previous: Optional[Derived] = None,
+    key: str = "country_region",
+) -> Tuple[Derived, List[object]]:
+    """Return `func(frame)`, recomputing only keys whose rows changed since
+    `previous`.
+
+    `frame` and `func` must meet the requirements of `run_partitioned()`. Keys with
+    the same hash as in `previous` are copied from its result, and the rest are
+    computed by `func` and spliced in, so the cost of a refresh grows with the
+    number of changed keys rather than the size of `frame`. Everything is
+    recomputed if there is no `previous` or the columns of `frame` changed.
+
+    Parameters
+    ----------
+    frame : pd.DataFrame
+        Data sorted by `key`.
+    func : Callable
+        Function adding columns to a DataFrame.
+    previous : Optional[Derived], optional
+        Result of the previous refresh, by default None.
+    key : str, optional
+        Column whose values are computed independently, by default
+        "country_region".
+
+    Returns
+    -------
+    derived, changed : Tuple
+        Result (Derived) to pass to the next refresh, with `func(frame)` as its
+        frame, and keys (List) that were recomputed.
+    """
+    segments = segment_hashes(frame, key)
+    columns = tuple(frame.columns)
+    if previous is None or previous.columns != columns:
+        # `func` may add columns in place, which would change `frame`
+        result = run_partitioned(frame.copy(), func, key)
+        return Derived(segments, columns, result), list(segments.index)
+
+    # Missing keys are filled with 0 rather than NaN, which would cast to float
+    known = segments.index.isin(previous.segments.index)
+    old = previous.segments.reindex(segments.index, fill_value=0)
+    same = known & (old["hash"].to_numpy() == segments["hash"].to_numpy())
+    if same.all():
+        return Derived(segments, columns, previous.frame), []
+
+    lengths = segments["length"].to_numpy()
+    changed_rows = np.repeat(~same, lengths)
+    recomputed = run_partitioned(
+        frame.loc[changed_rows].reset_index(drop=True), func, key
+    )
+
+    # Position of every row of the result in the previous result, followed by the
+    # recomputed rows, which are in the order of `frame`
+    offsets = np.where(same, old["start"] - segments["start"], 0)
+    take = np.arange(len(frame)) + np.repeat(offsets, lengths)
+    take[changed_rows] = len(previous.frame) + np.arange(len(recomputed))
+    result = pd.concat(
+        [previous.frame, recomputed[list(previous.frame.columns)]], ignore_index=True
+    )
+    result = result.take(take).reset_index(drop=True)
+    return Derived(segments, columns, result), list(segments.index[~same])
+
+
+def benchmark(
+    func: Callable[[pd.DataFrame], pd.DataFrame],
+    frame: pd.DataFrame,
+    fractions: Tuple[float, ...] = (0, 0.01, 0.1, 1),
+    key: str = "country_region",
+) -> Dict[float, float]:
+    """Return wall time in seconds of `refresh` by fraction of keys revised.
+
+    Revised keys have the last value of their first numeric column changed.
+    """
+    previous, _ = refresh(frame, func, key=key)
+    keys = pd.unique(frame[key])
+    column = frame.select_dtypes("number").columns[0]
+    last = np.r_[frame[key].to_numpy()[1:] != frame[key].to_numpy()[:-1], True]
+    timings = {}
+    for fraction in fractions:
+        revised = frame.copy()
+        rows = last & revised[key].isin(keys[: int(len(keys) * fraction)]).to_numpy()
+        revised.loc[rows, column] += 1
+        start = time.perf_counter()
+        refresh(revised, func, previous, key)
+        timings[fraction] = time.perf_counter() - start
+    return timings
+
+
+if __name__ == "__main__":
+    from src.data import _add_derived_columns
+
+    regions, days = 3000, 365
+    rng = np.random.default_rng(0)
+    growth = rng.uniform(-0.05, 0.1, size=(regions, 1))
+    delta = rng.poisson(np.exp(np.minimum(growth * np.arange(days), 12)))
+    frame = pd.DataFrame(
+        {
+            "country_region": np.repeat(
+                [f"region {i:04}" for i in range(regions)], days
+            ),
+            "date": np.tile(pd.date_range("2020-01-22", periods=days), regions),
+            "confirmed": delta.cumsum(axis=1).ravel().astype(float),
+            "deaths": (delta.cumsum(axis=1) // 50).ravel().astype(float),
+            "delta_confirmed": delta.ravel().astype(float),
+            "population": 10.0 ** 6,
+        }
+    )
+    start = time.perf_counter()
+    run_partitioned(frame, _add_derived_columns)
+    print(f"full recomputation, {len(frame)} rows: {time.perf_counter() - start:.2f}s")
+    for fraction, seconds in benchmark(_add_derived_columns, frame).items():
+        print(f"refresh, {fraction:.0%} of {regions} regions revised: {seconds:.2f}s")
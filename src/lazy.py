@@ -0,0 +1,60 @@
+import importlib
+import importlib.util
+import sys
+import threading
+from types import ModuleType
+from typing import Dict
+
+# Proxies returned by `lazy_import`, by module name
+_proxies: Dict[str, "_LazyModule"] = {}
+_lock = threading.RLock()
+
+
+class _LazyModule(ModuleType):
+    """Module imported on first access of an attribute.
+
+    The import runs under a lock, so threads touching the module for the first time
+    at the same time, e.g. Streamlit sessions or the section pool, wait for a
+    single complete import instead of seeing a partially executed module.
+    """
+
+    def __init__(self, name: str):
+        super().__init__(name)
+        self._module = None
+
+    def load(self) -> ModuleType:
+        """Return the imported module, importing it if needed."""
+        module = self._module
+        if module is None:
+            with _lock:
+                if self._module is None:
+                    self._module = importlib.import_module(self.__name__)
+                module = self._module
+        return module
+
+    def __getattr__(self, attr: str) -> object:
+        return getattr(self.load(), attr)
+
+
+def lazy_import(name: str) -> ModuleType:
+    """Return module `name`, which is imported on first access of an attribute.
+
+    Used for heavy dependencies that are not needed for every page, so that they do
+    not slow down start up of the app. Annotations using the module must not be
+    evaluated on import, e.g. with `from __future__ import annotations`. The module
+    may be first used from several threads at once.
+    """
+    if name in sys.modules:
+        return sys.modules[name]
+    if importlib.util.find_spec(name) is None:
+        raise ModuleNotFoundError(f"No module named '{name}'", name=name)
+    with _lock:
+        return _proxies.setdefault(name, _LazyModule(name))
+
+
+def load_lazy_modules() -> None:
+    """Import every module returned by `lazy_import` that is not imported yet."""
+    with _lock:
+        proxies = list(_proxies.values())
+    for proxy in proxies:
+        proxy.load()
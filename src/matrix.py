@@ -0,0 +1,46 @@
+from typing import Tuple
+
+import numpy as np
+import pandas as pd
+
+
+def to_matrix(
+    keys: pd.Series, dates: pd.Series, values: pd.Series
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Return dense keys × days matrix of `values`.
+
+    Days without a row are filled with zero.
+
+    Parameters
+    ----------
+    keys : pd.Series
+        Row label of each value, e.g. `country_region`.
+    dates : pd.Series
+        Normalised date of each value.
+    values : pd.Series
+        Values to place in the matrix.
+
+    Returns
+    -------
+    matrix, rows, cols : Tuple
+        Tuple consisting of `matrix` (np.ndarray) and the `rows` and `cols`
+        (np.ndarray) of each input value, so that `matrix[rows, cols]` maps
+        results back onto the input order.
+    """
+    rows, uniques = pd.factorize(keys)
+    days = dates.to_numpy(dtype="datetime64[D]")
+    cols = (days - days.min()).astype(np.int64)
+    matrix = np.zeros((len(uniques), cols.max() + 1))
+    matrix[rows, cols] = np.nan_to_num(values.to_numpy(dtype=float), nan=0.0)
+    return matrix, rows, cols
+
+
+def rolling_sum(matrix: np.ndarray, window: int) -> np.ndarray:
+    """Return trailing sum over `window` columns of every row in `matrix`.
+
+    The first `window - 1` columns are summed over the available history.
+    """
+    cumsum = np.cumsum(matrix, axis=1)
+    rolled = cumsum.copy()
+    rolled[:, window:] -= cumsum[:, :-window]
+    return rolled
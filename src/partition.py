@@ -0,0 +1,226 @@
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing.shared_memory import SharedMemory
+from typing import Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+# Frames with fewer rows are processed in-process, as starting processes and copying
+# columns to shared memory costs more than it saves
+PARALLEL_ROWS = int(os.environ.get("COVID19_PARALLEL_ROWS", 1_000_000))
+
+# Worker processes are started fresh rather than forked, as forking the threads of
+# the app, e.g. one holding a lock, may deadlock the child
+MP_CONTEXT = multiprocessing.get_context("spawn")
+
+# Name, dtype and shape of an array in shared memory
+ArraySpec = Tuple[str, str, Tuple[int, ...]]
+
+
+def partition_bounds(keys: pd.Series, partitions: int) -> List[Tuple[int, int]]:
+    """Return (start, stop) of about equally sized contiguous partitions of rows.
+
+    Partitions are only split where `keys` changes, so that rows with the same key,
+    e.g. a country in a frame sorted by country, are in the same partition.
+    """
+    keys = keys.to_numpy()
+    if not len(keys):
+        return []
+    starts = np.flatnonzero(np.r_[True, keys[1:] != keys[:-1]])
+    targets = np.linspace(0, len(keys), partitions + 1)[1:-1]
+    # First key change at or after each equal split
+    nearest = np.minimum(np.searchsorted(starts, targets), len(starts) - 1)
+    cuts = np.unique(starts[nearest])
+    bounds = [0] + [int(c) for c in cuts if 0 < c < len(keys)] + [len(keys)]
+    return list(zip(bounds[:-1], bounds[1:]))
+
+
+def _is_raw(values: pd.Series) -> bool:
+    """Return whether `values` are stored as plain numbers that can be shared as
+    bytes, rather than as pointers to objects, e.g. strings, which are only valid
+    in this process."""
+    return isinstance(values.dtype, np.dtype) and not values.dtype.hasobject
+
+
+def _share(array: np.ndarray, handles: List[SharedMemory]) -> ArraySpec:
+    """Copy `array` to new shared memory, appended to `handles`, and return spec."""
+    shm = SharedMemory(create=True, size=max(array.nbytes, 1))
+    handles.append(shm)
+    np.ndarray(array.shape, array.dtype, buffer=shm.buf)[:] = array
+    return shm.name, array.dtype.str, array.shape
+
+
+def _attach(spec: ArraySpec, handles: List[SharedMemory]) -> np.ndarray:
+    """Return array in shared memory described by `spec`."""
+    name, dtype, shape = spec
+    shm = SharedMemory(name=name)
+    handles.append(shm)
+    return np.ndarray(shape, np.dtype(dtype), buffer=shm.buf)
+
+
+def _run_partition(
+    func: Callable[[pd.DataFrame], pd.DataFrame],
+    columns: Dict[str, Tuple[ArraySpec, Optional[np.ndarray]]],
+    outputs: Dict[str, ArraySpec],
+    start: int,
+    stop: int,
+) -> None:
+    """Apply `func` to rows [`start`, `stop`) of the shared `columns` and write the
+    `outputs` columns of the result to shared memory."""
+    handles: List[SharedMemory] = []
+    try:
+        data = {}
+        for name, (spec, uniques) in columns.items():
+            array = _attach(spec, handles)[start:stop]
+            # Object columns are shared as codes into their unique values
+            data[name] = array.copy() if uniques is None else uniques[array]
+            del array
+        result = func(pd.DataFrame(data))
+        for name, spec in outputs.items():
+            _attach(spec, handles)[start:stop] = result[name].to_numpy()
+        del data, result
+    finally:
+        for shm in handles:
+            _close(shm)
+
+
+def _close(shm: SharedMemory, unlink: bool = False) -> None:
+    """Close, and optionally unlink, `shm`, unless arrays still use its buffer."""
+    try:
+        shm.close()
+        if unlink:
+            shm.unlink()
+    except (BufferError, FileNotFoundError):
+        pass
+
+
+def run_partitioned(
+    frame: pd.DataFrame,
+    func: Callable[[pd.DataFrame], pd.DataFrame],
+    key: str = "country_region",
+    workers: Optional[int] = None,
+    min_rows: int = PARALLEL_ROWS,
+) -> pd.DataFrame:
+    """Return `func(frame)`, applied to partitions of `frame` in a process pool.
+
+    `frame` must be sorted by `key`, and `func` must compute each row from the rows
+    with the same `key` only, keep the number and order of rows, and only add or
+    replace numeric columns. `func` must be defined at module level.
+
+    The columns of `frame` are copied once to shared memory, object columns as
+    integer codes, and each worker reads its partition from there and writes its
+    results to shared output columns, so no frames are pickled. Frames with fewer
+    than `min_rows` rows, or a single worker, are processed in-process.
+
+    Parameters
+    ----------
+    frame : pd.DataFrame
+        Data sorted by `key`.
+    func : Callable
+        Function adding columns to a DataFrame.
+    key : str, optional
+        Column whose values are never split between partitions, by default
+        "country_region".
+    workers : Optional[int], optional
+        Number of processes, by default the number of CPUs.
+    min_rows : int, optional
+        Fewest rows processed in parallel, by default `PARALLEL_ROWS`.
+
+    Returns
+    -------
+    pd.DataFrame
+        Result of `func(frame)`.
+    """
+    workers = workers or os.cpu_count() or 1
+    if len(frame) < min_rows or workers == 1:
+        return func(frame)
+
+    bounds = partition_bounds(frame[key], workers)
+    # Columns added or replaced by `func`, found by applying it to the first key
+    keys = frame[key].to_numpy()
+    changes = np.flatnonzero(keys != keys[0])
+    head = frame.iloc[: changes[0] if len(changes) else len(frame)]
+    sample = func(head.copy())
+    outputs = [
+        name
+        for name in sample.columns
+        if _is_raw(sample[name])
+        and (
+            name not in head
+            or not sample[name]
+            .reset_index(drop=True)
+            .equals(head[name].reset_index(drop=True))
+        )
+    ]
+
+    handles: List[SharedMemory] = []
+    try:
+        columns = {}
+        for name in frame.columns:
+            values = frame[name]
+            if not _is_raw(values):
+                codes, uniques = pd.factorize(values)
+                # Code -1 of missing values selects the NaN appended last
+                uniques = np.append(uniques.to_numpy(dtype=object), np.nan)
+                columns[name] = (_share(codes, handles), uniques)
+            else:
+                columns[name] = (_share(values.to_numpy(), handles), None)
+        output_specs = {
+            name: _share(np.empty(len(frame), dtype=sample[name].dtype), handles)
+            for name in outputs
+        }
+        with ProcessPoolExecutor(workers, mp_context=MP_CONTEXT) as executor:
+            futures = [
+                executor.submit(_run_partition, func, columns, output_specs, *bound)
+                for bound in bounds
+            ]
+            for future in futures:
+                future.result()
+
+        result = frame.copy()
+        for name, spec in output_specs.items():
+            result[name] = _attach(spec, handles).copy()
+        return result[list(sample.columns)]
+    finally:
+        for shm in handles:
+            _close(shm, unlink=True)
+
+
+def benchmark(
+    func: Callable[[pd.DataFrame], pd.DataFrame], frame: pd.DataFrame
+) -> Dict[int, float]:
+    """Return wall time in seconds of `run_partitioned` by number of workers."""
+    timings = {}
+    workers = 1
+    while workers <= (os.cpu_count() or 1):
+        start = time.perf_counter()
+        run_partitioned(frame, func, workers=workers, min_rows=0)
+        timings[workers] = time.perf_counter() - start
+        workers *= 2
+    return timings
+
+
+if __name__ == "__main__":
+    from src.data import _add_derived_columns
+
+    regions, days = 3000, 365
+    rng = np.random.default_rng(0)
+    growth = rng.uniform(-0.05, 0.1, size=(regions, 1))
+    delta = rng.poisson(np.exp(np.minimum(growth * np.arange(days), 12)))
+    frame = pd.DataFrame(
+        {
+            "country_region": np.repeat(
+                [f"region {i:04}" for i in range(regions)], days
+            ),
+            "date": np.tile(pd.date_range("2020-01-22", periods=days), regions),
+            "confirmed": delta.cumsum(axis=1).ravel().astype(float),
+            "deaths": (delta.cumsum(axis=1) // 50).ravel().astype(float),
+            "delta_confirmed": delta.ravel().astype(float),
+            "population": 10.0 ** 6,
+        }
+    )
+    for workers, seconds in benchmark(_add_derived_columns, frame).items():
+        print(f"derived columns, {len(frame)} rows, {workers} workers: {seconds:.2f}s")
@@ -1,11 +1,24 @@
+from __future__ import annotations
+
 from collections import OrderedDict
 from typing import List, Optional
 
-import altair as alt
 import pandas as pd
-from vega_datasets import data
 
-from src.data import _get_trajectory_data, get_most_affected
+from src.data import (
+    MAP_BINS,
+    _get_trajectory_data,
+    get_binned_dates,
+    get_map_bins,
+    get_most_affected,
+)
+from src.downsample import downsample
+from src.lazy import lazy_import
+from src.rollup import RollupCube
+
+# Imported on first use, as they are slow to import and not needed on every page
+alt = lazy_import("altair")
+vega_datasets = lazy_import("vega_datasets")
 
 COLUMN_TO_TITLE = OrderedDict(
     [
@@ -17,17 +30,45 @@ COLUMN_TO_TITLE = OrderedDict(
     ]
 )
 
+HEATMAP_COLUMN_TO_TITLE = OrderedDict(
+    [
+        ("scaled_delta_confirmed", "Scaled delta confirmed"),
+        ("delta_pr_100k", "New cases pr. 100.000"),
+        ("delta_confirmed_7d", "New cases (7-day average)"),
+        ("delta_confirmed_14d", "New cases (14-day average)"),
+        ("growth_rate", "Week-over-week growth"),
+        ("doubling_time", "Doubling time (days)"),
+        ("rt", "Reproduction number (Rt)"),
+    ]
+)
+
+ALIGNMENT_TO_TITLE = OrderedDict(
+    [
+        ("date", "Date"),
+        ("days_since_100_cases", "Days since 100th confirmed case"),
+        ("days_since_10_deaths", "Days since 10th death"),
+        ("days_since_1_per_100k", "Days since 1 confirmed case per 100.000"),
+    ]
+)
+
+ROLLING_WINDOW_TO_TITLE = OrderedDict(
+    [(None, "None"), (7, "7-day average"), (14, "14-day average")]
+)
+
 
 def create_map_plot(
     world_source: pd.DataFrame, column: str, country: Optional[str] = None
 ) -> alt.Chart:
     """Return alt.Chart map of world filled by value of `column`.
 
+    Countries are coloured by quantile class of `column` rather than by value, so
+    that the colour scale has `MAP_BINS` entries however many values there are.
+
     Parameters
     ----------
     world_source : pd.DataFrame
     column : str
-        Column value to fill country/countries by.
+        Column value to fill country/countries by, one of `COLUMN_TO_TITLE`.
     country : Optional[str], optional
         If passed a country name, `create_map_plot` will draw world plot
         with only the given country coloured. By default None.
@@ -36,10 +77,16 @@ def create_map_plot(
     -------
     final_map : alt.Chart
     """
+    bin_column = f"{column}_bin"
+    classes = get_map_bins(world_source, tuple(COLUMN_TO_TITLE))
+    lookup = world_source[["uid", "country_region", column]].assign(
+        **{bin_column: classes[bin_column]}
+    )
+    lookup = lookup.loc[lookup[bin_column] >= 0]
     if country:
-        world_source = world_source.loc[world_source["country_region"] == country]
+        lookup = lookup.loc[lookup["country_region"] == country]
 
-    source = alt.topo_feature(data.world_110m.url, "countries")
+    source = alt.topo_feature(vega_datasets.data.world_110m.url, "countries")
     background = alt.Chart(source).mark_geoshape()
 
     foreground = (
@@ -47,12 +94,14 @@ def create_map_plot(
         .mark_geoshape(stroke="black", strokeWidth=0.15)
         .encode(
             color=alt.Color(
-                f"{column}:N", scale=alt.Scale(scheme="lightgreyred"), legend=None,
+                f"{bin_column}:O",
+                scale=alt.Scale(scheme="lightgreyred", domain=list(range(MAP_BINS))),
+                legend=None,
             ),
         )
         .transform_lookup(
             lookup="id",
-            from_=alt.LookupData(world_source, "uid", [f"{column}", "country_region"]),
+            from_=alt.LookupData(lookup, "uid", [bin_column, column, "country_region"]),
         )
     )
 
@@ -74,24 +123,25 @@ def create_map_plot(
     return final_map
 
 
-def create_world_barplot(world_source: pd.DataFrame) -> alt.Chart:
+def create_world_barplot(cube: RollupCube) -> alt.Chart:
     """
     Return alt.Chart barplot of summary statistics of confirmed
     cases, recovered patients, deaths and active cases.
 
     Parameters
     ----------
-    world_source : pd.DataFrame
+    cube : RollupCube
+        Pre-aggregated data, resulting from `get_rollup_cube()`.
 
     Returns
     -------
     bar_world : alt.Chart
     """
     world_summary = (
-        world_source[["confirmed", "active", "deaths", "recovered"]]
-        .sum()
+        cube.snapshot[["confirmed", "active", "deaths", "recovered"]]
+        .astype(float)
         .reset_index(name="count")
-        .rename_column("index", "status")
+        .rename(columns={"index": "status"})
     )
     bar_world = (
         alt.Chart(world_summary)
@@ -144,17 +194,33 @@ def create_lineplot(
     x_label: str = "Date",
     color: str = "country_region",
     log: bool = False,
+    max_points: Optional[int] = None,
+    x: str = "date",
+    forecast: Optional[pd.DataFrame] = None,
 ) -> alt.Chart:
     """Return animated alt.Chart lineplot of confirmed cases by date.
 
     Parameters
     ----------
     time_source : pd.DataFrame
+    max_points : Optional[int], optional
+        If passed, downsample each line to at most `max_points` points with LTTB.
+        By default None (plot every point).
+    x : str, optional
+        Column of x-axis, "date" or a column in `ALIGNMENT_TO_TITLE` to align
+        countries by days since a threshold. By default "date".
+    forecast : Optional[pd.DataFrame], optional
+        If passed, overlay projected confirmed cases with their prediction interval,
+        from `get_forecast_data()`. Only drawn on the date axis. By default None.
 
     Returns
     -------
     time_chart : alt.Chart
     """
+    if x != "date":
+        time_source = time_source[time_source[x].notna()]
+    if max_points:
+        time_source = downsample(time_source, max_points=max_points, x=x, by=color)
     scale = "log" if log else "linear"
     highlight = alt.selection(
         type="single", on="mouseover", fields=[f"{color}"], nearest=True
@@ -163,7 +229,7 @@ def create_lineplot(
         alt.Chart(time_source)
         .mark_line()
         .encode(
-            x=alt.X("date:T", title=x_label),
+            x=alt.X("date:T" if x == "date" else f"{x}:Q", title=x_label),
             y=alt.Y(
                 f"confirmed:Q", title="Confirmed cases", scale=alt.Scale(type=scale)
             ),
@@ -184,14 +250,46 @@ def create_lineplot(
     time_lines = time_base.mark_line().encode(
         size=alt.condition(~highlight, alt.value(1), alt.value(3))
     )
-    time_chart = (
-        (time_points + time_lines)
-        .interactive()
-        .properties(title="Timeline of confirmed cases", width=600, height=300)
+    layers = time_points + time_lines
+    if forecast is not None and x == "date":
+        layers += _create_forecast_layers(forecast, "confirmed", color=color)
+    time_chart = layers.interactive().properties(
+        title="Timeline of confirmed cases", width=600, height=300
     )
     return time_chart
 
 
+def _create_forecast_layers(
+    forecast: pd.DataFrame, column: str, color: Optional[str] = None
+) -> alt.LayerChart:
+    """Return dashed line of projected `column` over a band of its prediction
+    interval, coloured by `color` if passed, else grey."""
+    colour = alt.Color(f"{color}:N", legend=None) if color else alt.value("dimgrey")
+    band = (
+        alt.Chart(forecast)
+        .mark_area(opacity=0.2)
+        .encode(
+            x="date:T", y=f"{column}_lower:Q", y2=f"{column}_upper:Q", color=colour,
+        )
+    )
+    projection = (
+        alt.Chart(forecast)
+        .mark_line(strokeDash=[4, 4])
+        .encode(
+            x="date:T",
+            y=f"{column}_forecast:Q",
+            color=colour,
+            tooltip=[
+                alt.Tooltip("date:T"),
+                alt.Tooltip(f"{column}_forecast:Q", title="Projection", format=",.0f"),
+                alt.Tooltip(f"{column}_lower:Q", title="Lower", format=",.0f"),
+                alt.Tooltip(f"{column}_upper:Q", title="Upper", format=",.0f"),
+            ],
+        )
+    )
+    return band + projection
+
+
 def create_heatmap(
     selection: pd.DataFrame,
     column: str = "scaled_delta_confirmed",
@@ -212,24 +310,35 @@ def create_heatmap(
         Countries to compare, passed by st.multiselect in `app.py`.
     column : str
         Value to plot. Default is 'scaled_confirmed', which is the standardised number
-        of confirmed cases.
+        of confirmed cases. See `HEATMAP_COLUMN_TO_TITLE` for the derived metrics
+        available, e.g. rolling averages and growth rates.
+
+    Dates are averaged into daily, weekly or monthly buckets depending on how many
+    fit in `width`, see `get_binned_dates()`.
 
     Returns
     -------
     heatmap : alt.Chart
     """
-    tooltip_title = column.replace("_", " ").capitalize()
+    tooltip_title = HEATMAP_COLUMN_TO_TITLE.get(
+        column, column.replace("_", " ").capitalize()
+    )
+    binned = get_binned_dates(selection, column=column, width=width)
     heatmap = (
-        alt.Chart(selection)
+        alt.Chart(binned)
         .mark_rect()
         .encode(
-            alt.X("monthdate(date):T", title=x_label, axis=alt.Axis(orient=x_orient)),
+            alt.X(
+                "date:T", title=x_label, axis=alt.Axis(orient=x_orient, format="%b %d"),
+            ),
+            alt.X2("date_end:T"),
             alt.Y("country_region:N", title="", axis=alt.Axis(orient=y_orient)),
             color=alt.Color(
                 f"{column}:Q", legend=None, scale=alt.Scale(scheme="lightgreyred"),
             ),
             tooltip=[
                 alt.Tooltip("date:T", title="Date"),
+                alt.Tooltip("bucket:N", title="Period"),
                 alt.Tooltip(f"{column}:Q", title=f"{tooltip_title}"),
             ],
         )
@@ -249,6 +358,8 @@ def create_country_barplot(
     x_label: str,
     y_label: str,
     colour: bool = False,
+    line: Optional[str] = None,
+    forecast: Optional[pd.DataFrame] = None,
 ) -> alt.Chart:
     """Return alt.Chart barplot of column given by `y`.
 
@@ -263,6 +374,11 @@ def create_country_barplot(
         Label for y-axis.
     colour : bool, optional
         Make barplot orange, by default False (resulting in blue barplot)
+    line : Optional[str], optional
+        Column to overlay as a line, e.g. a rolling average of `y`. By default None.
+    forecast : Optional[pd.DataFrame], optional
+        If passed, overlay projected `y` with its prediction interval, from
+        `get_forecast_data()`. By default None.
 
     Returns
     -------
@@ -277,13 +393,29 @@ def create_country_barplot(
     if colour:
         base = base.encode(color=alt.value("#ef8e3b"))
 
+    if line:
+        overlay = (
+            alt.Chart(interval_data)
+            .mark_line(color="black", strokeWidth=1.5)
+            .encode(x=alt.X("date:T", title=x_label), y=alt.Y(f"{line}:Q"))
+        )
+        base = alt.layer(base.encode(opacity=alt.value(0.5)), overlay)
+
+    if forecast is not None:
+        base = alt.layer(base, _create_forecast_layers(forecast, y))
+
     barplot = base.properties(height=150, width=600)
 
     return barplot
 
 
 def create_multiselect_line_plot(
-    interval_data: pd.DataFrame, countries: List, log: bool
+    interval_data: pd.DataFrame,
+    countries: List,
+    log: bool,
+    max_points: Optional[int] = None,
+    x: str = "date",
+    forecast: Optional[pd.DataFrame] = None,
 ) -> alt.Chart:
     """
     Return alt.Chart of multi-select lineplot of number of confirmed cases
@@ -292,17 +424,31 @@ def create_multiselect_line_plot(
     Parameters
     ----------
     interval_data : pd.DataFrame
-        Time series for a given interval.
+        Time series for a given interval, for the selected and compared countries.
     countries : List
         List of country names.
     log : bool
         Display number of confirmed cases on log scale.
+    max_points : Optional[int], optional
+        Maximum number of points per line, see `create_lineplot`. By default None.
+    x : str, optional
+        Column of x-axis of the lineplot, see `create_lineplot`. By default "date".
+    forecast : Optional[pd.DataFrame], optional
+        Projection to overlay on the lineplot, see `create_lineplot`. By default
+        None.
 
     Returns
     -------
     multiline : alt.Chart
     """
-    country_time_series = create_lineplot(interval_data, x_label="", log=log)
+    country_time_series = create_lineplot(
+        interval_data,
+        x_label="" if x == "date" else ALIGNMENT_TO_TITLE[x],
+        log=log,
+        max_points=max_points,
+        x=x,
+        forecast=forecast,
+    )
     heatbar = create_heatmap(
         interval_data,
         column="delta_pr_100k",
@@ -316,13 +462,23 @@ def create_multiselect_line_plot(
     return multiline
 
 
-def create_delta_barplots(interval_data: pd.DataFrame) -> alt.Chart:
+def create_delta_barplots(
+    interval_data: pd.DataFrame,
+    window: Optional[int] = None,
+    forecast: Optional[pd.DataFrame] = None,
+) -> alt.Chart:
     """Return alt.Chart barplot of `delta_confirmed`.
 
     Parameters
     ----------
     interval_data : pd.DataFrame
         Time series data in given interval.
+    window : Optional[int], optional
+        If passed a window in `ROLLING_WINDOW_TO_TITLE`, overlay the rolling
+        average over `window` days. By default None.
+    forecast : Optional[pd.DataFrame], optional
+        If passed, overlay projected daily cases and deaths with their prediction
+        intervals, from `get_forecast_data()`. By default None.
 
     Returns
     -------
@@ -333,6 +489,8 @@ def create_delta_barplots(interval_data: pd.DataFrame) -> alt.Chart:
         y="delta_confirmed",
         x_label="",
         y_label="Delta confirmed",
+        line=f"delta_confirmed_{window}d" if window else None,
+        forecast=forecast,
     )
     delta_deaths = create_country_barplot(
         interval_data=interval_data,
@@ -340,11 +498,50 @@ def create_delta_barplots(interval_data: pd.DataFrame) -> alt.Chart:
         x_label="Date",
         y_label="Delta deaths",
         colour=True,
+        line=f"delta_deaths_{window}d" if window else None,
+        forecast=forecast,
     )
     delta_chart = alt.vconcat(delta_confirmed, delta_deaths)
     return delta_chart
 
 
+def create_rt_plot(interval_data: pd.DataFrame) -> alt.Chart:
+    """Return alt.Chart lineplot of the estimated reproduction number.
+
+    The shaded band covers two posterior standard deviations around the estimate.
+
+    Parameters
+    ----------
+    interval_data : pd.DataFrame
+        Time series data in given interval.
+
+    Returns
+    -------
+    rt_chart : alt.Chart
+    """
+    base = alt.Chart(interval_data).transform_calculate(
+        rt_lower="datum.rt - 2 * datum.rt_std", rt_upper="datum.rt + 2 * datum.rt_std",
+    )
+    band = base.mark_area(opacity=0.3).encode(
+        x=alt.X("date:T", title="Date"),
+        y=alt.Y("rt_lower:Q", title="Reproduction number"),
+        y2="rt_upper:Q",
+    )
+    line = base.mark_line().encode(
+        x="date:T",
+        y="rt:Q",
+        tooltip=[
+            alt.Tooltip("date:T", title="Date"),
+            alt.Tooltip("rt:Q", title="Rt", format=".2f"),
+        ],
+    )
+    threshold = alt.Chart(pd.DataFrame({"rt": [1]})).mark_rule(color="#ef8e3b")
+    rt_chart = (band + line + threshold.encode(y="rt:Q")).properties(
+        height=200, width=600
+    )
+    return rt_chart
+
+
 def create_trajectory_plot(
     time_source: pd.DataFrame, linear: bool = False
 ) -> alt.Chart:
@@ -411,25 +608,29 @@ def create_trajectory_plot(
 
 
 def create_world_areaplot(
-    time_source: pd.DataFrame, x_label: str = "Date", color: str = "continent_name",
-) -> pd.DataFrame:
-    """[summary]
+    cube: RollupCube,
+    x_label: str = "Date",
+    color: str = "continent_name",
+    grain: str = "day",
+) -> alt.Chart:
+    """Return area plots of confirmed cases by continent, absolute and normalised.
 
     Parameters
     ----------
-    time_source : pd.DataFrame
-        [description]
+    cube : RollupCube
+        Pre-aggregated data, resulting from `get_rollup_cube()`.
+    x_label : str, optional
+        Title of x-axis, by default "Date".
+    grain : str, optional
+        Time grain of the cube to plot, one of day, week or month, by default "day".
 
     Returns
     -------
-    pd.DataFrame
-        [description]
+    alt.Chart
     """
-    time_continent = (
-        time_source.groupby(["continent_name", "date"])[["confirmed", "log_confirmed"]]
-        .sum()
-        .reset_index()
-    )
+    time_continent = cube.get(grain, "continent")[
+        ["continent_name", "date", "confirmed"]
+    ]
 
     world_areaplot = (
         alt.Chart(time_continent)
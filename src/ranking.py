@@ -0,0 +1,70 @@
+from typing import Dict, List
+
+import numpy as np
+import pandas as pd
+
+RANKED_METRICS = [
+    "confirmed",
+    "deaths",
+    "incident_rate",
+    "mortality_rate",
+    "delta_confirmed",
+    "delta_pr_100k",
+]
+
+# Number of leaders ranked per metric when the index is built
+DEPTH = 50
+
+
+class Leaderboard:
+    """Index of countries ranked by each metric in `RANKED_METRICS`.
+
+    For every metric only the leading `DEPTH` countries are ordered, found with a
+    partial sort (`np.argpartition`) instead of sorting every country. Deeper
+    top-N queries extend the ordering for that metric on demand.
+
+    Parameters
+    ----------
+    source : pd.DataFrame
+        DataFrame with one row per country, with column `country_region` and the
+        columns in `metrics`.
+    metrics : List[str], optional
+        Columns to rank countries by, by default `RANKED_METRICS`.
+    """
+
+    def __init__(self, source: pd.DataFrame, metrics: List[str] = RANKED_METRICS):
+        self.countries = source["country_region"].to_numpy()
+        self._index = {country: i for i, country in enumerate(self.countries)}
+        # Missing values rank last
+        self._values: Dict[str, np.ndarray] = {
+            metric: np.nan_to_num(
+                source[metric].to_numpy(dtype=float), nan=-np.inf, posinf=np.inf
+            )
+            for metric in metrics
+        }
+        self._leaders: Dict[str, np.ndarray] = {}
+        for metric in metrics:
+            self._rank_leaders(metric, DEPTH)
+
+    def _rank_leaders(self, metric: str, n: int) -> np.ndarray:
+        """Return row positions of the `n` largest values of `metric`, descending."""
+        leaders = self._leaders.get(metric)
+        if leaders is None or len(leaders) < min(n, len(self.countries)):
+            values = self._values[metric]
+            n = min(n, len(values))
+            if n < len(values):
+                leaders = np.argpartition(-values, n - 1)[:n]
+            else:
+                leaders = np.arange(len(values))
+            leaders = leaders[np.argsort(-values[leaders], kind="stable")]
+            self._leaders[metric] = leaders
+        return leaders[:n]
+
+    def top(self, metric: str, n: int = 10) -> np.ndarray:
+        """Return names of the `n` countries with the largest `metric`, descending."""
+        return self.countries[self._rank_leaders(metric, n)]
+
+    def rank(self, metric: str, country: str) -> int:
+        """Return rank of `country` by `metric`, where 1 is the largest value."""
+        values = self._values[metric]
+        return int(np.count_nonzero(values > values[self._index[country]])) + 1
@@ -0,0 +1,76 @@
+from collections import OrderedDict
+from typing import Dict, Tuple
+
+import pandas as pd
+
+GRAINS = OrderedDict([("day", "D"), ("week", "W"), ("month", "M")])
+LEVELS = OrderedDict(
+    [
+        ("country", ["country_region", "continent_name"]),
+        ("continent", ["continent_name"]),
+        ("world", []),
+    ]
+)
+
+# Cumulative measures take their last value in a period, daily changes are summed
+STOCKS = ["confirmed", "deaths", "recovered", "population"]
+FLOWS = ["delta_confirmed", "delta_deaths"]
+
+SNAPSHOT = ["confirmed", "active", "deaths", "recovered", "population"]
+
+# Continent of countries missing from the continent mapping, so that grouping keeps
+# them and continent totals add up to world totals
+OTHER_CONTINENT = "Other"
+
+
+class RollupCube:
+    """Time × geography aggregates of the time series, materialised up front.
+
+    Holds one DataFrame per combination of grain in `GRAINS` and level in `LEVELS`,
+    with the measures in `STOCKS` and `FLOWS`, plus a snapshot of world totals from
+    the most recent summary data. Charts and texts read from the cube, so no
+    aggregation happens when a page is rendered.
+
+    Parameters
+    ----------
+    time_source : pd.DataFrame
+        Time series data, resulting from `get_time_series_cases()`.
+    world_source : pd.DataFrame
+        Summary data, resulting from `get_world_source()`.
+    """
+
+    def __init__(self, time_source: pd.DataFrame, world_source: pd.DataFrame):
+        self._cells: Dict[Tuple[str, str], pd.DataFrame] = {}
+        measures = time_source[["date"] + LEVELS["country"] + STOCKS + FLOWS].copy()
+        measures["continent_name"] = measures["continent_name"].fillna(OTHER_CONTINENT)
+        for level, keys in LEVELS.items():
+            daily = measures.groupby(keys + ["date"])[STOCKS + FLOWS].sum()
+            self._cells[("day", level)] = daily.reset_index()
+            for grain, freq in list(GRAINS.items())[1:]:
+                self._cells[(grain, level)] = _roll_up(daily.reset_index(), keys, freq)
+
+        snapshot = world_source[SNAPSHOT].sum()
+        snapshot["date"] = world_source["date"].max()
+        self.snapshot = snapshot
+
+    def get(self, grain: str = "day", level: str = "world") -> pd.DataFrame:
+        """Return measures by `grain` (day, week or month) and `level`.
+
+        `level` is one of country, continent or world. Dates are the start of each
+        period.
+        """
+        return self._cells[(grain, level)]
+
+
+def _roll_up(daily: pd.DataFrame, keys: list, freq: str) -> pd.DataFrame:
+    """Return `daily` measures aggregated to periods of `freq`."""
+    period = daily["date"].dt.to_period(freq).dt.start_time.rename("period")
+    aggregations = {**{m: "last" for m in STOCKS}, **{m: "sum" for m in FLOWS}}
+    rolled = (
+        daily.sort_values(keys + ["date"])
+        .groupby(keys + [period])
+        .agg(aggregations)
+        .reset_index()
+        .rename(columns={"period": "date"})
+    )
+    return rolled
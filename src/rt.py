@@ -0,0 +1,142 @@
+import math
+import time
+from typing import Tuple
+
+import numpy as np
+import pandas as pd
+
+from src.matrix import rolling_sum, to_matrix
+
+# Serial interval of SARS-CoV-2, see Nishiura et al. (2020)
+SERIAL_INTERVAL_MEAN = 4.7
+SERIAL_INTERVAL_SD = 2.9
+SERIAL_INTERVAL_DAYS = 21
+
+# Gamma prior on Rt and smoothing window, see Cori et al. (2013)
+PRIOR_SHAPE = 1.0
+PRIOR_SCALE = 5.0
+WINDOW = 7
+MIN_CASES = 10
+
+
+def serial_interval(
+    mean: float = SERIAL_INTERVAL_MEAN,
+    sd: float = SERIAL_INTERVAL_SD,
+    days: int = SERIAL_INTERVAL_DAYS,
+) -> np.ndarray:
+    """Return discretised gamma distribution of the serial interval.
+
+    Element `s` is the probability that a secondary case shows symptoms `s` days
+    after its infector. Element 0 is always zero.
+    """
+    shape = (mean / sd) ** 2
+    scale = sd ** 2 / mean
+    s = np.arange(1, days + 1) - 0.5
+    log_pdf = (
+        (shape - 1) * np.log(s)
+        - s / scale
+        - math.lgamma(shape)
+        - shape * math.log(scale)
+    )
+    weights = np.concatenate(([0.0], np.exp(log_pdf)))
+    return weights / weights.sum()
+
+
+def infectiousness(incidence: np.ndarray, weights: np.ndarray) -> np.ndarray:
+    """Return total infectiousness of past cases for a countries × days matrix.
+
+    Computes the convolution of each row of `incidence` with the serial interval
+    `weights`, one array operation per lag.
+    """
+    total = np.zeros_like(incidence)
+    for lag in range(1, min(len(weights), incidence.shape[1])):
+        total[:, lag:] += weights[lag] * incidence[:, :-lag]
+    return total
+
+
+def estimate_rt(
+    incidence: np.ndarray,
+    window: int = WINDOW,
+    prior_shape: float = PRIOR_SHAPE,
+    prior_scale: float = PRIOR_SCALE,
+    min_cases: int = MIN_CASES,
+) -> Tuple[np.ndarray, np.ndarray]:
+    """Return posterior mean and standard deviation of Rt for every country and day.
+
+    Assumes cases in each trailing `window` arise from a Poisson process with rate
+    Rt times the infectiousness of earlier cases. With a gamma prior the posterior
+    is gamma too, so the update is a closed form over the whole matrix.
+
+    Parameters
+    ----------
+    incidence : np.ndarray
+        Countries × days matrix of new confirmed cases.
+    window : int, optional
+        Number of days Rt is assumed constant over, by default 7.
+    prior_shape : float, optional
+        Shape of gamma prior on Rt, by default 1.
+    prior_scale : float, optional
+        Scale of gamma prior on Rt, by default 5.
+    min_cases : int, optional
+        Minimum number of cases in window for an estimate to be reported, by default 10.
+
+    Returns
+    -------
+    rt_mean, rt_std : Tuple
+        Matrices (np.ndarray) shaped like `incidence`, NaN where there is too little data.
+    """
+    # Negative deltas are upstream corrections, not cases
+    incidence = np.clip(incidence, 0, None)
+    weights = serial_interval()
+
+    cases = rolling_sum(incidence, window)
+    pressure = rolling_sum(infectiousness(incidence, weights), window)
+
+    shape = prior_shape + cases
+    rate = 1 / prior_scale + pressure
+    valid = (cases >= min_cases) & (pressure > 0)
+    valid[:, : window - 1] = False
+
+    rt_mean = np.where(valid, shape / rate, np.nan)
+    rt_std = np.where(valid, np.sqrt(shape) / rate, np.nan)
+    return rt_mean, rt_std
+
+
+def get_time_series_rt(time_source: pd.DataFrame) -> Tuple[np.ndarray, np.ndarray]:
+    """Return estimated Rt and its standard deviation for each row of `time_source`.
+
+    Parameters
+    ----------
+    time_source : pd.DataFrame
+        Time series data with columns `country_region`, `date` and `delta_confirmed`.
+
+    Returns
+    -------
+    rt, rt_std : Tuple
+        Arrays (np.ndarray) aligned with the rows of `time_source`.
+    """
+    incidence, rows, cols = to_matrix(
+        time_source["country_region"],
+        time_source["date"],
+        time_source["delta_confirmed"],
+    )
+    rt_mean, rt_std = estimate_rt(incidence)
+    return rt_mean[rows, cols], rt_std[rows, cols]
+
+
+def benchmark(regions: int, days: int = 365, repeat: int = 5) -> float:
+    """Return best wall time in seconds of `estimate_rt` on synthetic data."""
+    rng = np.random.default_rng(0)
+    growth = rng.uniform(-0.05, 0.1, size=(regions, 1))
+    incidence = rng.poisson(np.exp(np.minimum(growth * np.arange(days), 12)))
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        estimate_rt(incidence.astype(float))
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+if __name__ == "__main__":
+    for regions in (200, 3000):
+        print(f"estimate_rt, {regions} regions x 365 days: {benchmark(regions):.3f}s")
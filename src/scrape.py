@@ -3,6 +3,8 @@ import pathlib
 import pandas as pd
 import requests
 
+from src.snapshots import save_snapshot
+
 DATA = {
     "cases.csv": "https://raw.githubusercontent.com/CSSEGISandData/COVID-19/web-data/data/cases.csv",  # noqa: E501
     "cases_country.csv": "https://raw.githubusercontent.com/CSSEGISandData/COVID-19/web-data/data/cases_country.csv",  # noqa: E501
@@ -10,7 +12,6 @@ DATA = {
 }
 
 FNAME = pathlib.Path("data/last_commit.txt")
-FNAME.parent.mkdir(parents=True, exist_ok=True)
 
 
 def get_last_commit_hash():
@@ -26,8 +27,10 @@ def check_if_commit_exists():
     """
     Return latest commit. If last_commit.txt doesn't exist, create it and return 'no commit hash'.
 
-    Note the side effect of creating last_commit.txt if it doesn't exist.
+    Note the side effect of creating last_commit.txt, and its directory, if it
+    doesn't exist.
     """
+    FNAME.parent.mkdir(parents=True, exist_ok=True)
     try:
         with FNAME.open("r") as f:
             commit = f.read()
@@ -66,6 +69,13 @@ def check_for_new_data():
             print(f"Downloading {fname}...")
             _ = pd.read_csv(url).to_csv(f"data/{fname}", index=False)
         print("Downloads complete.")
+        commit = check_if_commit_exists()
+        paths = [FNAME.parent.joinpath(fname) for fname in DATA] + [FNAME]
+        written = save_snapshot(commit, paths)["written"]
+        print(
+            f"Saved snapshot of commit '{commit}': "
+            f"{written['chunks']} new chunks, {written['bytes']} bytes."
+        )
     return None
 
 
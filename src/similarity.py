@@ -0,0 +1,113 @@
+import time
+
+import numpy as np
+import pandas as pd
+
+# Days since first case compared between curves
+FEATURE_DAYS = 120
+# Fewest days two curves must have in common to be compared
+MIN_OVERLAP = 14
+
+
+class SimilarityIndex:
+    """Index of countries by the shape of their epidemic curve.
+
+    Each country is a row of the feature matrix, holding its 7-day average of new
+    cases per 100,000 inhabitants for each of the first `FEATURE_DAYS` days since
+    its first case. Countries are compared by cosine similarity over the days both
+    have data for, so that curves are compared by shape rather than size and
+    countries with shorter histories can still be matched.
+
+    Parameters
+    ----------
+    time_source : pd.DataFrame
+        Time series data, resulting from `get_time_series_cases()`.
+    days : int, optional
+        Number of days since first case to compare, by default `FEATURE_DAYS`.
+    """
+
+    def __init__(self, time_source: pd.DataFrame, days: int = FEATURE_DAYS):
+        started = time_source[time_source["confirmed"] > 0]
+        first_case = started.groupby("country_region")["date"].transform("min")
+        day = (started["date"] - first_case).dt.days.to_numpy()
+        self.countries, row = np.unique(
+            started["country_region"].to_numpy(), return_inverse=True
+        )
+        self._index = {country: i for i, country in enumerate(self.countries)}
+
+        values = (
+            started["delta_confirmed_7d"] / started["population"] * 10 ** 5
+        ).to_numpy(dtype=float)
+        keep = (day < days) & np.isfinite(values)
+        self.features = np.zeros((len(self.countries), days))
+        self.mask = np.zeros((len(self.countries), days))
+        self.features[row[keep], day[keep]] = np.maximum(values[keep], 0)
+        self.mask[row[keep], day[keep]] = 1
+        self._squares = self.features ** 2
+
+    def similarities(self, country: str) -> np.ndarray:
+        """Return cosine similarity of every country's curve to that of `country`.
+
+        Similarity is computed over the days both curves have data for, and is NaN
+        where they have fewer than `MIN_OVERLAP` days in common.
+        """
+        i = self._index[country]
+        query, query_mask = self.features[i], self.mask[i]
+        dot = self.features @ query
+        norms = np.sqrt((self._squares @ query_mask) * (self.mask @ query ** 2))
+        overlap = self.mask @ query_mask
+        with np.errstate(invalid="ignore", divide="ignore"):
+            similarity = dot / norms
+        similarity[(overlap < MIN_OVERLAP) | (norms == 0)] = np.nan
+        return similarity
+
+    def nearest(self, country: str, k: int = 3) -> np.ndarray:
+        """Return names of the `k` countries with curves most similar to `country`.
+
+        The country itself is excluded. Countries with no comparable curve are not
+        returned, so fewer than `k` countries may be returned.
+        """
+        if country not in self._index:
+            return self.countries[:0]
+        similarity = self.similarities(country)
+        similarity[self._index[country]] = np.nan
+        candidates = np.flatnonzero(np.isfinite(similarity))
+        k = min(k, len(candidates))
+        if k == 0:
+            return self.countries[:0]
+        scores = similarity[candidates]
+        nearest = np.argpartition(-scores, k - 1)[:k]
+        nearest = nearest[np.argsort(-scores[nearest], kind="stable")]
+        return self.countries[candidates[nearest]]
+
+
+def benchmark(regions: int, days: int = 365, repeat: int = 100) -> float:
+    """Return best wall time in seconds of `SimilarityIndex.nearest` on synthetic
+    data."""
+    rng = np.random.default_rng(0)
+    growth = rng.uniform(0.01, 0.1, size=(regions, 1))
+    cases = np.exp(np.minimum(growth * np.arange(days), 12))
+    time_source = pd.DataFrame(
+        {
+            "country_region": np.repeat([f"region {i}" for i in range(regions)], days),
+            "date": np.tile(pd.date_range("2020-01-22", periods=days), regions),
+            "confirmed": cases.cumsum(axis=1).ravel(),
+            "delta_confirmed_7d": cases.ravel(),
+            "population": 10 ** 6,
+        }
+    )
+    index = SimilarityIndex(time_source)
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        index.nearest("region 0", k=3)
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+if __name__ == "__main__":
+    for regions in (200, 3000):
+        seconds = benchmark(regions)
+        print(
+            f"nearest, {regions} regions x {FEATURE_DAYS} days: {seconds * 1000:.3f}ms"
+        )
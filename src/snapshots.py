@@ -0,0 +1,277 @@
+import argparse
+import datetime
+import difflib
+import hashlib
+import json
+import os
+import pathlib
+import re
+import sys
+import tempfile
+import zlib
+from typing import Dict, Iterator, List, Optional, Sequence
+
+# Directory of chunks and manifests, shared by all snapshots
+STORE = pathlib.Path(os.environ.get("COVID19_SNAPSHOT_DIR", "data/snapshots"))
+
+# A chunk ends after a line whose checksum has these bits all zero, i.e. after
+# about 512 lines on average. Chunks are at least MIN_CHUNK_BYTES long, unless at
+# the end of a file, and at most MAX_CHUNK_BYTES, split within a line only if the
+# line alone is longer.
+BOUNDARY_MASK = 511
+MIN_CHUNK_BYTES = 4 * 1024
+MAX_CHUNK_BYTES = 1024 * 1024
+
+HUNK = re.compile(r"^@@ -(\d+)(,\d+)? \+(\d+)(,\d+)? @@")
+
+
+def chunk_lines(content: bytes) -> Iterator[bytes]:
+    """Yield content-defined chunks of `content`, which concatenate to `content`.
+
+    Boundaries depend only on the line before them, so inserting or changing a
+    line changes the chunk it is in, while the following chunks stay the same and
+    are stored only once.
+    """
+    start = 0
+    position = 0
+    while position < len(content):
+        end = content.find(b"\n", position)
+        end = len(content) if end == -1 else end + 1
+        if end - start > MAX_CHUNK_BYTES:
+            # Cut before this line, or within it if it alone is too long
+            end = position if position > start else start + MAX_CHUNK_BYTES
+        elif (
+            end - start < MIN_CHUNK_BYTES
+            or zlib.crc32(content[position:end]) & BOUNDARY_MASK
+        ) and end < len(content):
+            position = end
+            continue
+        yield content[start:end]
+        start = position = end
+
+
+def _write_atomic(path: pathlib.Path, content: bytes) -> None:
+    """Write `content` to `path` through a temporary file in the same directory."""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=path.parent, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(content)
+        os.replace(tmp, path)
+    except BaseException:
+        os.unlink(tmp)
+        raise
+
+
+def _chunk_path(digest: str, store: pathlib.Path) -> pathlib.Path:
+    return store.joinpath("chunks", digest[:2], digest[2:])
+
+
+def _manifest_path(commit: str, store: pathlib.Path) -> pathlib.Path:
+    return store.joinpath("manifests", f"{commit}.json")
+
+
+def save_snapshot(
+    commit: str, paths: Sequence[pathlib.Path], store: pathlib.Path = STORE
+) -> Dict[str, object]:
+    """Store `paths` as the snapshot of `commit` and return its manifest.
+
+    Each file is split by `chunk_lines()`, and chunks not already in `store` are
+    written compressed under their SHA-256 hash, so that disk use grows with the
+    amount of changed data rather than the number of snapshots. The manifest lists
+    the chunks of every file, and their number of lines, by file name.
+
+    Parameters
+    ----------
+    commit : str
+        Upstream commit hash the files were downloaded from.
+    paths : Sequence[pathlib.Path]
+        Files to store.
+    store : pathlib.Path, optional
+        Directory of the snapshot store, by default `STORE`.
+
+    Returns
+    -------
+    Dict[str, object]
+        Manifest of the snapshot, with number of chunks and bytes written.
+    """
+    files = {}
+    written = {"chunks": 0, "bytes": 0}
+    for path in map(pathlib.Path, paths):
+        content = path.read_bytes()
+        digests, lines = [], []
+        for chunk in chunk_lines(content):
+            digest = hashlib.sha256(chunk).hexdigest()
+            target = _chunk_path(digest, store)
+            if not target.exists():
+                compressed = zlib.compress(chunk)
+                _write_atomic(target, compressed)
+                written["chunks"] += 1
+                written["bytes"] += len(compressed)
+            digests.append(digest)
+            lines.append(chunk.count(b"\n"))
+        files[path.name] = {
+            "size": len(content),
+            "sha256": hashlib.sha256(content).hexdigest(),
+            "chunks": digests,
+            "lines": lines,
+        }
+    manifest = {
+        "commit": commit,
+        "created": datetime.datetime.now(datetime.timezone.utc).isoformat(),
+        "files": files,
+    }
+    _write_atomic(
+        _manifest_path(commit, store), json.dumps(manifest, indent=1).encode()
+    )
+    return dict(manifest, written=written)
+
+
+def load_manifest(commit: str, store: pathlib.Path = STORE) -> Dict[str, object]:
+    """Return manifest of the snapshot of `commit`."""
+    path = _manifest_path(commit, store)
+    if not path.exists():
+        raise KeyError(f"No snapshot of commit '{commit}' in {store}")
+    return json.loads(path.read_text())
+
+
+def list_snapshots(store: pathlib.Path = STORE) -> List[Dict[str, object]]:
+    """Return manifests of all snapshots in `store`, oldest first."""
+    manifests = [
+        json.loads(path.read_text())
+        for path in store.joinpath("manifests").glob("*.json")
+    ]
+    return sorted(manifests, key=lambda manifest: manifest["created"])
+
+
+def _read_chunk(digest: str, store: pathlib.Path) -> bytes:
+    return zlib.decompress(_chunk_path(digest, store).read_bytes())
+
+
+def restore_snapshot(
+    commit: str,
+    target: pathlib.Path = pathlib.Path("data/"),
+    files: Optional[Sequence[str]] = None,
+    store: pathlib.Path = STORE,
+) -> List[pathlib.Path]:
+    """Write the files of the snapshot of `commit` to `target` and return them.
+
+    Every file is checked against its hash in the manifest and replaced atomically,
+    so a running app sees either the old or the restored file.
+
+    Parameters
+    ----------
+    commit : str
+        Commit hash of the snapshot.
+    target : pathlib.Path, optional
+        Directory to write files to, by default "data/".
+    files : Optional[Sequence[str]], optional
+        Names of files to restore, by default all files of the snapshot.
+    store : pathlib.Path, optional
+        Directory of the snapshot store, by default `STORE`.
+
+    Returns
+    -------
+    List[pathlib.Path]
+        Paths of restored files.
+    """
+    manifest = load_manifest(commit, store)
+    restored = []
+    for name, entry in manifest["files"].items():
+        if files is not None and name not in files:
+            continue
+        content = b"".join(_read_chunk(digest, store) for digest in entry["chunks"])
+        if hashlib.sha256(content).hexdigest() != entry["sha256"]:
+            raise ValueError(f"Snapshot of '{name}' at commit '{commit}' is corrupt")
+        path = pathlib.Path(target).joinpath(name)
+        _write_atomic(path, content)
+        restored.append(path)
+    return restored
+
+
+def diff_snapshots(
+    old: str, new: str, store: pathlib.Path = STORE, context: int = 0
+) -> Iterator[str]:
+    """Yield unified diff of the files of the snapshots of `old` and `new`.
+
+    Chunk lists are compared first, so only chunks that differ between the
+    snapshots are read and compared line by line.
+    """
+    old_files = load_manifest(old, store)["files"]
+    new_files = load_manifest(new, store)["files"]
+    for name in sorted(set(old_files) | set(new_files)):
+        empty = {"chunks": [], "lines": []}
+        a, a_lines = map(old_files.get(name, empty).get, ["chunks", "lines"])
+        b, b_lines = map(new_files.get(name, empty).get, ["chunks", "lines"])
+        if a == b:
+            continue
+        yield f"--- {old}/{name}\n+++ {new}/{name}\n"
+        matcher = difflib.SequenceMatcher(a=a, b=b, autojunk=False)
+        for tag, i1, i2, j1, j2 in matcher.get_opcodes():
+            if tag == "equal":
+                continue
+            before = b"".join(_read_chunk(d, store) for d in a[i1:i2])
+            after = b"".join(_read_chunk(d, store) for d in b[j1:j2])
+            lines = difflib.unified_diff(
+                before.decode().splitlines(keepends=True),
+                after.decode().splitlines(keepends=True),
+                n=context,
+            )
+            # Skip file headers, which are printed once per file above, and number
+            # lines from the start of the file rather than of the chunks
+            a_offset, b_offset = sum(a_lines[:i1]), sum(b_lines[:j1])
+            for line in lines:
+                match = HUNK.match(line)
+                if match:
+                    old_start, old_count, new_start, new_count = match.groups()
+                    line = (
+                        f"@@ -{int(old_start) + a_offset}{old_count or ''} "
+                        f"+{int(new_start) + b_offset}{new_count or ''} @@\n"
+                    )
+                elif line.startswith(("---", "+++")):
+                    continue
+                yield line
+
+
+def store_size(store: pathlib.Path = STORE) -> int:
+    """Return bytes used by chunks in `store`."""
+    return sum(path.stat().st_size for path in store.glob("chunks/*/*"))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Manage snapshots of data versions.")
+    parser.add_argument("--store", type=pathlib.Path, default=STORE)
+    commands = parser.add_subparsers(dest="command", required=True)
+    save = commands.add_parser("save", help="store files as snapshot of a commit")
+    save.add_argument("commit")
+    save.add_argument("paths", nargs="+", type=pathlib.Path)
+    commands.add_parser("list", help="list snapshots")
+    restore = commands.add_parser("restore", help="restore files of a snapshot")
+    restore.add_argument("commit")
+    restore.add_argument("--target", type=pathlib.Path, default=pathlib.Path("data/"))
+    restore.add_argument("--files", nargs="+")
+    diff = commands.add_parser("diff", help="show changes between two snapshots")
+    diff.add_argument("old")
+    diff.add_argument("new")
+    diff.add_argument("--context", type=int, default=0)
+    args = parser.parse_args()
+
+    if args.command == "save":
+        manifest = save_snapshot(args.commit, args.paths, args.store)
+        written = manifest["written"]
+        print(
+            f"Saved snapshot '{args.commit}': "
+            f"{written['chunks']} new chunks, {written['bytes']} bytes."
+        )
+    elif args.command == "list":
+        for manifest in list_snapshots(args.store):
+            size = sum(entry["size"] for entry in manifest["files"].values())
+            print(f"{manifest['commit']}  {manifest['created']}  {size} bytes")
+        print(f"Store uses {store_size(args.store)} bytes.")
+    elif args.command == "restore":
+        for path in restore_snapshot(args.commit, args.target, args.files, args.store):
+            print(f"Restored {path}.")
+    else:
+        sys.stdout.writelines(
+            diff_snapshots(args.old, args.new, args.store, args.context)
+        )
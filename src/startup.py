@@ -0,0 +1,68 @@
+import argparse
+import os
+import subprocess
+import sys
+from typing import Dict, List, Tuple
+
+# Seconds `import app` may take, measured by `python -X importtime`
+BUDGET = float(os.environ.get("COVID19_IMPORT_BUDGET", 1.5))
+
+# Modules that must not be imported before they are used
+LAZY = ["altair", "vega_datasets", "janitor"]
+
+
+def measure_imports(module: str = "app") -> List[Tuple[str, int, int, int]]:
+    """Return (name, depth, self, cumulative) of every module imported by `module`.
+
+    Times are in microseconds, as reported by `python -X importtime` in a fresh
+    interpreter. Depth is the nesting level of the import.
+    """
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        stderr=subprocess.PIPE,
+        universal_newlines=True,
+        check=True,
+    )
+    imports = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "[us]" in line:
+            continue
+        own, cumulative, name = line[len("import time:") :].split("|")
+        depth = (len(name) - len(name.lstrip())) // 2
+        imports.append((name.strip(), depth, int(own), int(cumulative)))
+    return imports
+
+
+def check_startup(
+    module: str = "app", budget: float = BUDGET, top: int = 10
+) -> Dict[str, object]:
+    """Return import time of `module`, its slowest direct imports and violations.
+
+    Violations are exceeding `budget` seconds and importing any module in `LAZY`.
+    """
+    imports = measure_imports(module)
+    total = next(cum for name, _, _, cum in imports if name == module) / 10 ** 6
+    direct = sorted(
+        [(name, cum / 10 ** 6) for name, depth, _, cum in imports if depth == 1],
+        key=lambda item: -item[1],
+    )
+    loaded = {name.split(".")[0] for name, _, _, _ in imports}
+    violations = [f"imports {name}" for name in LAZY if name in loaded]
+    if total > budget:
+        violations.append(f"takes {total:.2f}s, over budget of {budget:.2f}s")
+    return {"total": total, "slowest": direct[:top], "violations": violations}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Check import time of the app.")
+    parser.add_argument("--module", default="app")
+    parser.add_argument("--budget", type=float, default=BUDGET)
+    args = parser.parse_args()
+
+    report = check_startup(args.module, args.budget)
+    print(f"import {args.module}: {report['total']:.3f}s (budget {args.budget:.2f}s)")
+    for name, seconds in report["slowest"]:
+        print(f"  {seconds:7.3f}s  {name}")
+    for violation in report["violations"]:
+        print(f"FAIL: {args.module} {violation}")
+    sys.exit(1 if report["violations"] else 0)
@@ -1,8 +1,13 @@
+import base64
+import functools
+import html
 import pathlib
 from typing import Dict
 
 import pandas as pd
-import streamlit as st
+
+from src.cache import cached
+from src.rollup import RollupCube
 
 DATA_PATH = pathlib.Path("data/")
 PATH = pathlib.Path("templates/")
@@ -10,17 +15,18 @@ HEATMAP_TEXT = PATH.joinpath("heatmap_text_template.md")
 HEATMAP_INTRO = PATH.joinpath("heatmap_intro_template.md")
 
 
+@functools.lru_cache(maxsize=None)
 def read_text(filename: str) -> str:
-    """Returns Markdown file as string."""
+    """Returns Markdown file as string. Files are read once, on first use."""
     markdown = PATH.joinpath(filename)
     with markdown.open(mode="r") as file:
         text = file.read()
     return text
 
 
-COUNTRY_TEMPLATE = read_text("country_text_template.md")
-WORLD_TEMPLATE = read_text("world_text_template.md")
-SIDEBAR_TEMPLATE = read_text("sidebar_intro.md")
+COUNTRY_TEMPLATE = "country_text_template.md"
+WORLD_TEMPLATE = "world_text_template.md"
+SIDEBAR_TEMPLATE = "sidebar_intro.md"
 
 
 def _get_last_update():
@@ -63,7 +69,7 @@ def create_country_text_intro(world_source: pd.DataFrame, country: str) -> str:
         Brief country-specific text introducing summary statistics.
     """
     country_df = world_source[world_source["country_region"] == country]
-    text_intro = COUNTRY_TEMPLATE.format(
+    text_intro = read_text(COUNTRY_TEMPLATE).format(
         last_update=country_df["date"].dt.strftime("%A %B %d, %Y").values[0],
         country_region=country_df["country_region"].values[0],
         confirmed=country_df["confirmed"].values[0],
@@ -74,8 +80,7 @@ def create_country_text_intro(world_source: pd.DataFrame, country: str) -> str:
     return text_intro
 
 
-@st.cache(show_spinner=False)
-def create_world_text_intro(world_source) -> str:
+def create_world_text_intro(cube: RollupCube) -> str:
     """Return string containing text introductions for use in world summary page.
 
     The text is built from a standardised Markdown-file using summary statistics from the data
@@ -83,37 +88,26 @@ def create_world_text_intro(world_source) -> str:
 
     Parameters
     ----------
-    world_source : pd.DataFrame
-        Global summary infection data, resulting from `get_world_source`.
+    cube : RollupCube
+        Pre-aggregated data, resulting from `get_rollup_cube`.
 
     Returns
     -------
     text_intro : str
         Brief ctext introducing global summary statistics.
     """
-    summary = world_source[
-        ["date", "population", "confirmed", "deaths", "incident_rate"]
-    ].agg(
-        {
-            "date": "unique",
-            "population": "sum",
-            "confirmed": "sum",
-            "deaths": "sum",
-            "incident_rate": "sum",
-        }
-    )
-    text_intro = WORLD_TEMPLATE.format(
-        last_update=summary["date"].dt.strftime("%A %B %d, %Y").values[0],
-        confirmed=summary["confirmed"].values[0],
-        incident_rate=(summary["confirmed"].values[0] / summary["population"].values[0])
-        * 10 ** 5,
-        deaths=summary["deaths"].values[0],
-        death_rate=(summary["deaths"].values[0] / summary["confirmed"].values[0]) * 100,
+    summary = cube.snapshot
+    text_intro = read_text(WORLD_TEMPLATE).format(
+        last_update=summary["date"].strftime("%A %B %d, %Y"),
+        confirmed=summary["confirmed"],
+        incident_rate=(summary["confirmed"] / summary["population"]) * 10 ** 5,
+        deaths=summary["deaths"],
+        death_rate=(summary["deaths"] / summary["confirmed"]) * 100,
     )
     return text_intro
 
 
-@st.cache(show_spinner=False)
+@cached
 def create_country_intros(world_source: pd.DataFrame) -> Dict:
     """Return dictionary containing text introductions of all countries.
 
@@ -133,39 +127,39 @@ def create_country_intros(world_source: pd.DataFrame) -> Dict:
     }
 
 
-@st.cache(show_spinner=False)
+@cached
 def create_sidebar_intro() -> str:
     """Return intro text for sidebar."""
     last_update = _get_last_update()
-    sidebar_intro = SIDEBAR_TEMPLATE.format(last_update=last_update)
+    sidebar_intro = read_text(SIDEBAR_TEMPLATE).format(last_update=last_update)
     return sidebar_intro
 
 
-@st.cache(show_spinner=False)
+@cached
 def create_home_intro() -> str:
     """Return text for Home section."""
     return read_text("intro_template.md")
 
 
-@st.cache(show_spinner=False)
+@cached
 def create_geo_intro() -> str:
     """Return text for geographic plot in World section."""
     return read_text("geo_text_template.md")
 
 
-@st.cache(show_spinner=False)
+@cached
 def create_number_confirmed_intro() -> str:
     """Return text for number of confirmed cases plot in World section."""
     return read_text("num_cases_template.md")
 
 
-@st.cache(show_spinner=False)
+@cached
 def create_most_affected_intro() -> str:
     """Return text for number of confirmed cases plot in World section."""
     return read_text("most_affected_template.md")
 
 
-@st.cache(show_spinner=False)
+@cached
 def create_country_cases_intro() -> str:
     """Return text for number of confirmed cases plot in World section."""
     return read_text("country_cases_template.md")
@@ -181,3 +175,19 @@ def create_country_trajectory_intro(country: str) -> str:
     """Return text for number of confirmed cases plot in World section."""
     text = read_text("country_trajectory_template.md").format(country=country)
     return text
+
+
+def create_country_rt_intro(country: str) -> str:
+    """Return text for reproduction number plot in Countries section."""
+    text = read_text("country_rt_template.md").format(country=country)
+    return text
+
+
+def create_download_link(content: bytes, filename: str, mime: str) -> str:
+    """Return HTML link to download `content` as `filename`, embedded as base64."""
+    encoded = base64.b64encode(content).decode()
+    filename = html.escape(filename)
+    return (
+        f'<a href="data:{mime};base64,{encoded}" download="{filename}">'
+        f"Download {filename}</a>"
+    )
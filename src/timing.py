@@ -0,0 +1,136 @@
+import functools
+import hashlib
+import os
+import pickle
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from contextlib import contextmanager
+from typing import Callable, Iterator, List, Tuple
+
+from src.cache import _MISSING, CACHE, FLIGHTS
+from src.lazy import load_lazy_modules
+
+DEBUG = bool(os.environ.get("COVID19_DEBUG"))
+# Threads building page sections concurrently, shared by every session
+WORKERS = int(os.environ.get("COVID19_WORKERS", 4))
+
+_pool = ThreadPoolExecutor(max_workers=WORKERS, thread_name_prefix="sections")
+
+# Timings of the current script run. Streamlit runs each session in its own thread.
+_local = threading.local()
+
+
+def reset_timings() -> None:
+    """Forget timings of the previous script run."""
+    _local.timings = []
+    _local.start = time.perf_counter()
+
+
+def get_timings() -> List[Tuple[str, float, float, str]]:
+    """Return (name, start, seconds, status) of everything timed in the current run,
+    with start in seconds since the run started."""
+    return list(getattr(_local, "timings", []))
+
+
+def _record(name: str, start: float, seconds: float, status: str) -> None:
+    if not hasattr(_local, "timings"):
+        reset_timings()
+    if getattr(_local, "pooled", False):
+        status = f"{status} in pool"
+    _local.timings.append((name, start - _local.start, seconds, status))
+
+
+@contextmanager
+def timed(name: str) -> Iterator[None]:
+    """Record wall time of the enclosed block under `name`."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        _record(name, start, time.perf_counter() - start, "computed")
+
+
+def submit(func: Callable, *args, **kwargs) -> Future:
+    """Call `func` in the shared pool of `WORKERS` threads and return its future.
+
+    Used to build the sections of a page concurrently, e.g. charts whose widgets
+    have been read, while results are shown in page order. `func` must not call
+    Streamlit. Modules returned by `lazy_import` are imported before `func` is
+    submitted. Timings recorded in the pool, e.g. by memoized sections, are added
+    to those of the current run, and the call itself is timed unless memoized.
+    """
+    if not hasattr(_local, "timings"):
+        reset_timings()
+    timings, run_start = _local.timings, _local.start
+    # Heavy modules are imported here rather than in the pool, so that the first
+    # import is not timed as part of whichever section happens to touch it first
+    load_lazy_modules()
+
+    def call():
+        _local.timings, _local.start, _local.pooled = timings, run_start, True
+        start = time.perf_counter()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            if not getattr(func, "memoized", False):
+                _record(func.__name__, start, time.perf_counter() - start, "computed")
+            del _local.timings, _local.start, _local.pooled
+
+    return _pool.submit(call)
+
+
+def _key(func: Callable, args: tuple, kwargs: dict) -> str:
+    """Return key of a call to `func` that is stable between processes."""
+    digest = hashlib.sha1(pickle.dumps((args, sorted(kwargs.items()))))
+    return f"{func.__module__}.{func.__qualname__}-{digest.hexdigest()}"
+
+
+def _compute(func: Callable, key: str, args: tuple, kwargs: dict) -> tuple:
+    """Return (status, result) of `func`, unless stored by a call that just
+    completed, and store it in `CACHE` under `key`."""
+    result = CACHE.peek(key, _MISSING)
+    if result is not _MISSING:
+        return "reused", result
+    result = func(*args, **kwargs)
+    CACHE.set(key, result)
+    return "computed", result
+
+
+def memoize(func: Callable) -> Callable:
+    """Memoize `func` in `CACHE` on its arguments, which must be picklable, and time
+    each call.
+
+    Used for page sections that are keyed only on their own inputs, e.g. country,
+    interval and the state of their widgets, so that a rerun triggered by another
+    widget reuses the section instead of rebuilding it. Sections count against the
+    byte budget of `CACHE`, are evicted with the data version, and are shared with
+    other processes if `CACHE` has a shared cache. Concurrent calls with the same
+    arguments, e.g. from sections built in the pool, wait for a single computation.
+    """
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        key = _key(func, args, kwargs)
+        start = time.perf_counter()
+        status = "reused"
+        result = CACHE.get(key, _MISSING)
+        if result is _MISSING:
+            status, result = FLIGHTS.do(key, lambda: _compute(func, key, args, kwargs))
+        _record(func.__name__, start, time.perf_counter() - start, status)
+        return result
+
+    wrapper.memoized = True
+    return wrapper
+
+
+def format_timings() -> str:
+    """Return Markdown table of timings in the current run, by start."""
+    rows = [
+        f"| {name} | {start * 1000:.1f} | {seconds * 1000:.1f} | {status} |"
+        for name, start, seconds, status in sorted(
+            get_timings(), key=lambda timing: timing[1]
+        )
+    ]
+    header = ["| Section | Start ms | ms | Status |", "| --- | ---: | ---: | --- |"]
+    return "\n".join(header + rows)
@@ -1,3 +1,3 @@
 #!/bin/bash
-python3 /app/src/scrape.py
+python3 -m src.scrape
 streamlit run app.py
\ No newline at end of file
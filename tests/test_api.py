@@ -0,0 +1,85 @@
+import threading
+
+import pandas as pd
+import pytest
+
+from src import api
+
+
+@pytest.fixture
+def datasets(monkeypatch):
+    world = pd.DataFrame({"country_region": ["Norway", "Sweden"], "confirmed": [1, 2]})
+    version = {"current": "v1"}
+    monkeypatch.setattr(api, "read_data_version", lambda: version["current"])
+    monkeypatch.setattr(api, "get_time_series_cases", lambda version: None)
+    monkeypatch.setattr(api, "get_delta_confirmed", lambda frame: frame)
+    monkeypatch.setattr(api, "get_world_source", lambda frame, version: world)
+    monkeypatch.setattr(api, "get_most_affected", lambda frame: frame)
+    datasets = api.Datasets(max_bytes=10_000)
+    datasets.switch = lambda new: version.update(current=new)
+    return datasets
+
+
+def test_gzip_and_identity_bodies_have_distinct_etags(datasets):
+    response = datasets.response("/world", "json", 1, 10)
+    assert response.version == "v1"
+    assert response.etag != response.compressed_etag
+    datasets.switch("v2")
+    assert datasets.response("/world", "json", 1, 10).etag != response.etag
+
+
+def test_responses_are_bounded(datasets):
+    for page_size in range(1, 200):
+        datasets.response("/world", "json", 1, page_size)
+    assert datasets._current.responses.stats()["resident_bytes"] <= 10_000
+
+
+def test_concurrent_requests_build_once(datasets, monkeypatch):
+    calls = []
+    build = api._Version._build
+
+    def slow_build(self, key):
+        calls.append(key)
+        release.wait(5)
+        return build(self, key)
+
+    datasets.response("/world", "json", 1, 10)
+    release = threading.Event()
+    monkeypatch.setattr(api._Version, "_build", slow_build)
+    threads = [
+        threading.Thread(target=datasets.response, args=("/countries", "json", 2, 1))
+        for _ in range(4)
+    ]
+    for thread in threads:
+        thread.start()
+    # Other responses are served while the build is in flight
+    assert datasets.response("/world", "json", 1, 10) is not None
+    release.set()
+    for thread in threads:
+        thread.join()
+    assert calls == [("/countries", "json", 2, 1)]
+
+
+@pytest.mark.parametrize(
+    "header, matches",
+    [
+        ('"v1-abc"', True),
+        ('"v0-xyz", W/"v1-abc"', True),
+        ("*", True),
+        ('"v1-ab"', False),
+        ('"v1-abc-gzip"', False),
+        ("", False),
+    ],
+)
+def test_if_none_match_compares_whole_tags(header, matches):
+    assert api._matches('"v1-abc"', header) is matches
+
+
+def test_cache_version_is_switched_once_per_data_version(datasets, monkeypatch):
+    switches = []
+    monkeypatch.setattr(api.CACHE, "set_version", switches.append)
+    for page in [1, 2, 1]:
+        datasets.response("/world", "json", page, 10)
+    datasets.switch("v2")
+    datasets.response("/world", "json", 1, 10)
+    assert switches == ["v1", "v2"]
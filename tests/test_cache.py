@@ -0,0 +1,73 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from src.cache import Cache, SingleFlight, cached
+
+
+def test_concurrent_calls_are_computed_once():
+    calls = []
+
+    @cached
+    def slow(x: int) -> int:
+        calls.append(x)
+        time.sleep(0.2)
+        return x * 2
+
+    with ThreadPoolExecutor(max_workers=32) as pool:
+        results = list(pool.map(slow, [1] * 16 + [2] * 16))
+    assert results == [2] * 16 + [4] * 16
+    assert sorted(calls) == [1, 2]
+
+
+def test_concurrent_calls_all_raise_error_of_single_computation():
+    calls = []
+
+    @cached
+    def failing(x: int) -> int:
+        calls.append(x)
+        time.sleep(0.2)
+        raise ValueError(x)
+
+    with ThreadPoolExecutor(max_workers=16) as pool:
+        futures = [pool.submit(failing, 3) for _ in range(16)]
+    assert all(isinstance(future.exception(), ValueError) for future in futures)
+    assert calls == [3]
+
+
+def test_waiting_for_flight_times_out():
+    flights = SingleFlight(timeout=0.05)
+    with ThreadPoolExecutor(max_workers=2) as pool:
+        leader = pool.submit(flights.do, "key", lambda: time.sleep(0.3))
+        time.sleep(0.05)
+        with pytest.raises(TimeoutError):
+            flights.do("key", lambda: None)
+        leader.result()
+
+
+def test_cache_evicts_least_recently_used_and_other_versions():
+    cache = Cache(max_bytes=10 ** 6, ttl=None)
+    cache.set_version("v1")
+    cache.set("a", b"x" * 400_000)
+    cache.set("b", b"x" * 400_000)
+    cache.get("a")
+    cache.set("c", b"x" * 400_000)
+    assert cache.get("b") is None
+    assert cache.get("a") is not None
+
+    cache.set_version("v2")
+    assert cache.stats()["entries"] == 0
+
+
+def test_unversioned_entries_are_kept_within_budget():
+    cache = Cache(max_bytes=10 ** 6, ttl=None)
+    cache.set_version("v1")
+    cache.set("versioned", b"x" * 100)
+    cache.set("previous", b"x" * 100, versioned=False)
+    cache.set_version("v2")
+    assert cache.get("versioned") is None
+    assert cache.get("previous") is not None
+
+    cache.set("large", b"x" * 10 ** 6)
+    assert cache.get("previous") is None
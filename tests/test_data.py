@@ -0,0 +1,210 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from src import data
+from src.data import (
+    MIN_CELL_WIDTH,
+    TIME_SERIES_DTYPES,
+    get_binned_dates,
+    get_time_series_cases,
+    read_time_series,
+)
+
+HEADER = (
+    "Country_Region,Last_Update,Confirmed,Deaths,Recovered,Active,Delta_Confirmed,"
+    "Delta_Recovered,Incident_Rate,People_Tested,People_Hospitalized,"
+    "Province_State,FIPS,UID,iso3\n"
+)
+
+
+@pytest.mark.parametrize("content", ["", HEADER], ids=["empty", "header only"])
+def test_time_series_without_rows_is_empty_frame(tmp_path, content):
+    csv = tmp_path / "cases_time.csv"
+    csv.write_text(content)
+    cleaned = read_time_series(csv)
+    expected = {
+        "date" if name == "last_update" else name for name in TIME_SERIES_DTYPES
+    }
+    assert len(cleaned) == 0
+    assert set(cleaned.columns) == expected - {"province_state"}
+    assert cleaned["date"].dtype.kind == "M"
+    assert cleaned["confirmed"].dtype == float
+
+
+def _write_time_series(csv, revised: float = 0) -> None:
+    days = 30
+    delta = np.tile(np.arange(1.0, days + 1), 3)
+    frame = pd.DataFrame(
+        {
+            "Country_Region": np.repeat(["Albania", "Norway", "Sweden"], days),
+            "Last_Update": np.tile(pd.date_range("2020-03-01", periods=days), 3),
+            "Delta_Confirmed": delta,
+            "Confirmed": np.tile(np.cumsum(np.arange(1.0, days + 1)), 3),
+            "Deaths": 0.0,
+            "Province_State": np.nan,
+            "iso3": np.repeat(["ALB", "NOR", "SWE"], days),
+        }
+    )
+    frame.loc[frame["Country_Region"] == "Norway", "Confirmed"] += revised
+    frame.to_csv(csv, index=False)
+
+
+@pytest.fixture
+def dimension(monkeypatch):
+    worldwide = pd.DataFrame(
+        {
+            "iso3": ["ALB", "NOR", "SWE"],
+            "country_region": ["Albania", "Norway", "Sweden"],
+            "population": [3e6, 5e6, 10e6],
+            "uid": [8, 578, 752],
+        }
+    )
+    continents = pd.DataFrame(
+        {"continent_name": ["Europe"] * 3, "iso3": ["ALB", "NOR", "SWE"]}
+    )
+    monkeypatch.setattr(data, "_get_worldwide_cases", lambda: worldwide)
+    monkeypatch.setattr(data, "_get_continents", lambda: continents)
+
+
+def test_time_series_is_refreshed_across_data_versions(tmp_path, dimension):
+    csv = tmp_path / "cases_time.csv"
+    _write_time_series(csv)
+    first = get_time_series_cases(csv, version="refresh-v1")
+    assert "population" not in first
+
+    _write_time_series(csv, revised=5)
+    refreshed = get_time_series_cases(csv, version="refresh-v2")
+
+    full = tmp_path / "full.csv"
+    _write_time_series(full, revised=5)
+    expected = get_time_series_cases(full, version="refresh-v2")
+    pd.testing.assert_frame_equal(refreshed, expected)
+    assert not refreshed.equals(first)
+
+
+@pytest.mark.parametrize(
+    "cells, bucket, first",
+    [(60, "Daily", 0.0), (10, "Weekly", 3.0), (3, "Monthly", 14.5)],
+)
+def test_dates_are_binned_to_fit_width(cells, bucket, first):
+    # 60 days from Monday March 2nd span 9 weeks and 2 months
+    time_source = pd.DataFrame(
+        {
+            "country_region": "Norway",
+            "date": pd.date_range("2020-03-02", periods=60),
+            "delta_confirmed": np.arange(60.0),
+        }
+    )
+    binned = get_binned_dates(time_source, "delta_confirmed", cells * MIN_CELL_WIDTH)
+    assert set(binned["bucket"]) == {bucket}
+    assert len(binned) == {"Daily": 60, "Weekly": 9, "Monthly": 2}[bucket]
+    assert binned["delta_confirmed"].iloc[0] == first
+    assert (binned["date_end"] > binned["date"]).all()
+
+
+def test_empty_time_source_is_binned_to_empty_frame():
+    time_source = pd.DataFrame(
+        {
+            "country_region": pd.Series(dtype=object),
+            "date": pd.Series(dtype="datetime64[ns]"),
+            "delta_confirmed": pd.Series(dtype=float),
+        }
+    )
+    binned = get_binned_dates(time_source, "delta_confirmed", 400)
+    assert binned.empty
+    assert list(binned.columns) == [
+        "country_region",
+        "date",
+        "delta_confirmed",
+        "date_end",
+        "bucket",
+    ]
+
+
+def test_rolling_columns_do_not_cross_countries():
+    days = np.arange(21.0)
+    time_series = pd.DataFrame(
+        {
+            "country_region": np.repeat(["Norway", "Sweden"], 21),
+            "confirmed": np.r_[2 ** (days / 7), np.full(21, 100.0)],
+            "delta_confirmed": np.r_[days + 1, np.full(21, 5.0)],
+            "delta_deaths": 0.0,
+        }
+    )
+    result = data._add_rolling_columns(time_series)
+    norway, sweden = result.iloc[:21], result.iloc[21:]
+
+    # Trailing means over the available history, e.g. mean(1, ..., 7) = 4
+    assert norway["delta_confirmed_7d"].iloc[[0, 1, 6, 20]].tolist() == [1, 1.5, 4, 18]
+    assert (sweden["delta_confirmed_7d"] == 5).all()
+    assert (sweden["delta_confirmed_14d"] == 5).all()
+
+    # Week-over-week growth is undefined for the first week of each country
+    assert sweden["growth_rate"].iloc[:7].isna().all()
+    assert (sweden["growth_rate"].iloc[7:] == 0).all()
+    assert norway["growth_rate"].iloc[13] == pytest.approx(11 / 4 - 1)
+
+    # Confirmed cases double every week, and Sweden does not grow
+    np.testing.assert_allclose(norway["doubling_time"].iloc[7:], 7)
+    assert sweden["doubling_time"].isna().all()
+
+
+def test_alignment_counts_days_since_threshold_per_country():
+    dates = pd.date_range("2020-03-01", periods=5)
+    time_series = pd.DataFrame(
+        {
+            "country_region": np.repeat(["Norway", "Sweden", "Tuvalu"], 5),
+            "date": np.tile(dates, 3),
+            "confirmed": [50, 100, 150, 200, 250] + [300] * 5 + [0, 0, 0, 0, 1],
+            "deaths": [0, 0, 10, 10, 20] + [0] * 5 + [0] * 5,
+            "population": [10 ** 7] * 10 + [10 ** 4] * 5,
+        }
+    )
+    result = data._add_alignment_columns(time_series)
+    norway, sweden, tuvalu = (result.iloc[i : i + 5] for i in (0, 5, 10))
+
+    nan = np.nan
+    np.testing.assert_array_equal(norway["days_since_100_cases"], [nan, 0, 1, 2, 3])
+    np.testing.assert_array_equal(norway["days_since_10_deaths"], [nan, nan, 0, 1, 2])
+    np.testing.assert_array_equal(sweden["days_since_100_cases"], [0, 1, 2, 3, 4])
+    assert sweden["days_since_10_deaths"].isna().all()
+    # 100 cases in 10 million and 1 case in 10,000 inhabitants are both at least 1
+    # per 100,000
+    np.testing.assert_array_equal(norway["days_since_1_per_100k"], [nan, 0, 1, 2, 3])
+    np.testing.assert_array_equal(tuvalu["days_since_1_per_100k"], [nan] * 4 + [0])
+
+
+def test_map_bins_are_quantile_classes():
+    world_source = pd.DataFrame(
+        {
+            "confirmed": np.r_[np.arange(14.0, 0, -1), np.nan],
+            "deaths": np.r_[np.zeros(10), np.arange(1.0, 6)],
+            "people_tested": np.nan,
+        }
+    )
+    classes = data.get_map_bins(
+        world_source, ("confirmed", "deaths", "people_tested"), bins=7
+    )
+    # Two countries in each of the 7 classes, in order of value
+    assert classes["confirmed_bin"].tolist() == [
+        6,
+        6,
+        5,
+        5,
+        4,
+        4,
+        3,
+        3,
+        2,
+        2,
+        1,
+        1,
+        0,
+        0,
+        -1,
+    ]
+    deaths = classes["deaths_bin"]
+    assert (deaths[:10] == 0).all() and deaths.is_monotonic_increasing
+    assert deaths.max() < 7
+    assert (classes["people_tested_bin"] == -1).all()
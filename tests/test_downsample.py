@@ -0,0 +1,72 @@
+import numpy as np
+import pandas as pd
+
+from src.downsample import downsample, lttb_indices
+
+
+def _reference_lttb(x: np.ndarray, y: np.ndarray, max_points: int) -> list:
+    """Return indices kept by the textbook, one-series-at-a-time LTTB."""
+    every = (len(x) - 2) / (max_points - 2)
+    kept = [0]
+    for bucket in range(max_points - 2):
+        start = int(np.floor(bucket * every)) + 1
+        stop = int(np.floor((bucket + 1) * every)) + 1
+        next_stop = min(int(np.floor((bucket + 2) * every)) + 1, len(x))
+        avg_x, avg_y = x[stop:next_stop].mean(), y[stop:next_stop].mean()
+        a = kept[-1]
+        area = np.abs(
+            (x[a] - avg_x) * (y[start:stop] - y[a])
+            - (x[a] - x[start:stop]) * (avg_y - y[a])
+        )
+        kept.append(start + int(np.argmax(area)))
+    return kept + [len(x) - 1]
+
+
+def test_short_series_are_kept():
+    x = np.arange(5.0)
+    keep = lttb_indices(x, x ** 2, np.array([5]), max_points=10)
+    assert keep.all()
+
+
+def test_long_series_keep_ends_and_peak():
+    x = np.arange(100.0)
+    y = np.zeros(100)
+    y[37] = 50
+    keep = lttb_indices(x, y, np.array([100]), max_points=10)
+    assert keep.sum() == 10
+    assert keep[0] and keep[37] and keep[-1]
+
+
+def test_series_are_downsampled_independently():
+    rng = np.random.default_rng(0)
+    lengths = np.array([80, 4, 120])
+    x = np.concatenate([np.arange(n, dtype=float) for n in lengths])
+    y = rng.random(lengths.sum())
+    keep = lttb_indices(x, y, lengths, max_points=12)
+
+    start = 0
+    for i, n in enumerate(lengths):
+        alone = lttb_indices(
+            x[start : start + n], y[start : start + n], lengths[[i]], 12
+        )
+        np.testing.assert_array_equal(keep[start : start + n], alone)
+        assert alone.sum() == min(n, 12)
+        if n > 12:
+            expected = _reference_lttb(x[start : start + n], y[start : start + n], 12)
+            assert list(np.flatnonzero(alone)) == expected
+        start += n
+
+
+def test_downsample_limits_rows_per_country():
+    days = 90
+    frame = pd.DataFrame(
+        {
+            "country_region": np.repeat(["Sweden", "Norway"], days),
+            "date": np.tile(pd.date_range("2020-03-01", periods=days), 2),
+            "confirmed": np.r_[np.arange(days), np.arange(days) ** 2].astype(float),
+        }
+    )
+    result = downsample(frame, max_points=30)
+    assert (result["country_region"].value_counts() == 30).all()
+    assert result.groupby("country_region")["date"].is_monotonic_increasing.all()
+    assert result["confirmed"].max() == (days - 1) ** 2
@@ -0,0 +1,60 @@
+import pathlib
+
+import pandas as pd
+import pytest
+
+from src import data, duckdb_engine
+
+pytest.importorskip("duckdb")
+
+TIME_SERIES = """\
+Country_Region,Last_Update,Confirmed,Deaths,Recovered,Active,Delta_Confirmed,\
+Delta_Recovered,Incident_Rate,People_Tested,People_Hospitalized,Province_State,\
+FIPS,UID,iso3
+Norway,03/01/2020,1.0,0.0,0.0,1.0,1.0,0,0.1,,,,,578,NOR
+Norway,03/02/2020,3.0,0.0,0.0,3.0,2.0,0,0.3,10,,,,578,NOR
+US,03/01/2020,5.0,1.0,0.0,4.0,5.0,0,0.2,,,,,840,USA
+US,03/01/2020,2.0,0.0,0.0,2.0,2.0,0,0.1,,,Alabama,1,84001,USA
+Diamond Princess,03/01/2020,7.0,0.0,0.0,7.0,0.0,0,,,,,,9999,
+"""
+
+WORLDWIDE = """\
+Country_Region,Last_Update,Lat,Long_,Confirmed,Deaths,Recovered,Active,\
+Incident_Rate,People_Tested,People_Hospitalized,Mortality_Rate,UID,ISO3
+Norway,2020-03-02 10:00:00,60.5,8.5,3.0,0.0,0.0,3.0,0.3,,,0.0,578,NOR
+Albania,2020-03-02 10:00:00,41.2,20.2,2.0,0.0,0.0,2.0,0.1,,,0.0,8,ALB
+"""
+
+
+def _write(path: pathlib.Path, content: str, suffix: str) -> pathlib.Path:
+    """Write CSV `content` to `path` with `suffix`, converting it for Parquet."""
+    csv = path.with_suffix(".csv")
+    csv.write_text(content)
+    if suffix == ".csv":
+        return csv
+    pytest.importorskip("pyarrow")
+    parquet = path.with_suffix(".parquet")
+    pd.read_csv(csv).to_parquet(parquet, index=False)
+    return parquet
+
+
+def _assert_same(expected: pd.DataFrame, result: pd.DataFrame) -> None:
+    expected = expected.reset_index(drop=True)
+    result = result.reset_index(drop=True)[expected.columns]
+    pd.testing.assert_frame_equal(expected, result, check_dtype=False)
+
+
+@pytest.mark.parametrize("suffix", [".csv", ".parquet"])
+def test_time_series_matches_pandas_engine(tmp_path, suffix):
+    path = _write(tmp_path / "cases_time", TIME_SERIES, suffix)
+    expected = data.read_time_series(path)
+    assert list(expected["country_region"]) == ["Norway", "Norway", "US"]
+    _assert_same(expected, duckdb_engine.read_time_series(path))
+
+
+@pytest.mark.parametrize("suffix", [".csv", ".parquet"])
+def test_worldwide_cases_match_pandas_engine(tmp_path, suffix):
+    path = _write(tmp_path / "cases_country", WORLDWIDE, suffix)
+    _assert_same(
+        data.read_worldwide_cases(path), duckdb_engine.read_worldwide_cases(path)
+    )
@@ -0,0 +1,105 @@
+import pathlib
+import shutil
+
+import numpy as np
+import pandas as pd
+
+from src import export
+
+ROOT = pathlib.Path(__file__).parents[1]
+COUNTRIES = {"ALB": "Albania", "NOR": "Norway", "SWE": "Sweden"}
+
+
+def _write_data(path: pathlib.Path, days: int = 60) -> None:
+    """Write raw data of a few countries to `path`, as downloaded by src.scrape."""
+    path.mkdir()
+    dates = pd.date_range("2020-03-01", periods=days)
+    rows, summaries = [], []
+    for uid, (iso3, country) in enumerate(COUNTRIES.items()):
+        delta = np.arange(days, dtype=float) * (uid + 1)
+        confirmed = delta.cumsum()
+        rows.append(
+            pd.DataFrame(
+                {
+                    "Country_Region": country,
+                    "Last_Update": dates.strftime("%m/%d/%Y"),
+                    "Confirmed": confirmed,
+                    "Deaths": confirmed // 50,
+                    "Recovered": confirmed // 2,
+                    "Active": confirmed - confirmed // 2,
+                    "Delta_Confirmed": delta,
+                    "Delta_Recovered": 0.0,
+                    "Incident_Rate": confirmed / 10,
+                    "People_Tested": np.nan,
+                    "People_Hospitalized": np.nan,
+                    "Province_State": np.nan,
+                    "FIPS": np.nan,
+                    "UID": uid,
+                    "iso3": iso3,
+                }
+            )
+        )
+        summaries.append(
+            {
+                "Country_Region": country,
+                "Last_Update": dates[-1].strftime("%Y-%m-%d %H:%M:%S"),
+                "Lat": 0,
+                "Long_": 0,
+                "Confirmed": confirmed[-1],
+                "Deaths": confirmed[-1] // 50,
+                "Recovered": confirmed[-1] // 2,
+                "Active": confirmed[-1] - confirmed[-1] // 2,
+                "Incident_Rate": confirmed[-1] / 10,
+                "People_Tested": np.nan,
+                "People_Hospitalized": np.nan,
+                "Mortality_Rate": np.nan,
+                "UID": uid,
+                "ISO3": iso3,
+            }
+        )
+    pd.concat(rows).to_csv(path / "cases_time.csv", index=False)
+    pd.DataFrame(summaries).to_csv(path / "cases_country.csv", index=False)
+    pd.DataFrame({"continent_name": "Europe", "iso3": list(COUNTRIES)}).to_csv(
+        path / "continent_mapping.csv", index=False
+    )
+    (path / "last_commit.txt").write_text("export-test")
+
+
+def test_fingerprint_changes_with_code_version(monkeypatch):
+    frame = pd.DataFrame({"confirmed": [1.0, 2.0]})
+    before = export._fingerprint(frame)
+    monkeypatch.setattr(export, "CODE_VERSION", "next")
+    assert export._fingerprint(frame) != before
+
+
+def test_stale_pages_and_datasets_are_removed(tmp_path):
+    pages = tmp_path / "pages"
+    (pages / "countries").mkdir(parents=True)
+    (tmp_path / "data").mkdir()
+    (pages / "home.json").write_text('[["markdown", "Home"]]')
+    (pages / "countries" / "norway.json").write_text(
+        '[["chart", {"data": {"url": "data/data-1.json"}}]]'
+    )
+    (pages / "countries" / "atlantis.json").write_text(
+        '[["chart", {"data": {"url": "data/data-2.json"}}]]'
+    )
+    for name in ["data-1", "data-2"]:
+        (tmp_path / "data" / f"{name}.json.gz").write_bytes(b"")
+
+    removed = export._remove_stale(tmp_path, ["home", "countries/norway"])
+    assert sorted(path.relative_to(tmp_path).as_posix() for path in removed) == [
+        "data/data-2.json.gz",
+        "pages/countries/atlantis.json",
+    ]
+    assert (tmp_path / "data" / "data-1.json.gz").exists()
+
+
+def test_second_export_rebuilds_nothing(tmp_path, monkeypatch):
+    _write_data(tmp_path / "data")
+    shutil.copytree(ROOT / "templates", tmp_path / "templates")
+    monkeypatch.chdir(tmp_path)
+
+    rebuilt = export.export(tmp_path / "site")
+    assert len(rebuilt) == 3 + len(COUNTRIES) and all(rebuilt.values())
+    assert (tmp_path / "site" / "pages" / "countries" / "norway.json").exists()
+    assert not any(export.export(tmp_path / "site").values())
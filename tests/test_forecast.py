@@ -0,0 +1,49 @@
+import numpy as np
+import pandas as pd
+
+from src.forecast import HORIZON, get_forecasts
+
+
+def _time_source(deaths_per_day: dict, days: int = 60) -> pd.DataFrame:
+    frames = []
+    for country, deaths in deaths_per_day.items():
+        cases = np.exp(0.05 * np.arange(days)) * 10
+        daily_deaths = np.zeros(days)
+        daily_deaths[-len(deaths) :] = deaths
+        frames.append(
+            pd.DataFrame(
+                {
+                    "country_region": country,
+                    "date": pd.date_range("2020-03-01", periods=days),
+                    "confirmed": cases.cumsum(),
+                    "deaths": daily_deaths.cumsum(),
+                    "delta_confirmed_7d": cases,
+                    "delta_deaths_7d": daily_deaths,
+                }
+            )
+        )
+    return pd.concat(frames, ignore_index=True)
+
+
+def test_country_without_deaths_keeps_case_projection():
+    time_source = _time_source({"Both": np.arange(1, 31), "Cases only": [1, 1]})
+    forecasts = get_forecasts(time_source)
+
+    cases_only = forecasts[forecasts["country_region"] == "Cases only"]
+    assert len(cases_only) == HORIZON
+    assert cases_only["delta_confirmed_forecast"].notna().all()
+    assert cases_only["delta_deaths_forecast"].isna().all()
+
+    both = forecasts[forecasts["country_region"] == "Both"]
+    assert (
+        both[["delta_confirmed_forecast", "delta_deaths_forecast"]].notna().all().all()
+    )
+
+
+def test_country_without_any_fit_is_dropped():
+    time_source = _time_source({"Both": np.arange(1, 31)})
+    empty = time_source.assign(
+        country_region="Empty", delta_confirmed_7d=0.0, delta_deaths_7d=0.0
+    )
+    forecasts = get_forecasts(pd.concat([time_source, empty], ignore_index=True))
+    assert set(forecasts["country_region"]) == {"Both"}
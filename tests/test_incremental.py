@@ -0,0 +1,40 @@
+import numpy as np
+import pandas as pd
+
+from src.data import _add_derived_columns
+from src.incremental import refresh
+
+
+def _time_series(regions: int, days: int = 40, seed: int = 0) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    delta = rng.poisson(20, size=(regions, days)).astype(float)
+    return pd.DataFrame(
+        {
+            "country_region": np.repeat(
+                [f"region {i:02}" for i in range(regions)], days
+            ),
+            "date": np.tile(pd.date_range("2020-03-01", periods=days), regions),
+            "confirmed": delta.cumsum(axis=1).ravel(),
+            "deaths": (delta.cumsum(axis=1) // 20).ravel(),
+            "delta_confirmed": delta.ravel(),
+            "population": 10.0 ** 6,
+        }
+    )
+
+
+def test_refresh_matches_full_recomputation():
+    frame = _time_series(6)
+    previous, changed = refresh(frame, _add_derived_columns)
+    assert len(changed) == 6
+
+    # Revise region 01, remove region 03 and add region 06
+    revised = frame[frame["country_region"] != "region 03"].copy()
+    revised.loc[revised["country_region"] == "region 01", "confirmed"] += 5
+    added = _time_series(7, seed=1)
+    added = added[added["country_region"] == "region 06"]
+    revised = pd.concat([revised, added], ignore_index=True)
+
+    derived, changed = refresh(revised, _add_derived_columns, previous)
+    assert changed == ["region 01", "region 06"]
+    expected = _add_derived_columns(revised.copy())
+    pd.testing.assert_frame_equal(derived.frame, expected)
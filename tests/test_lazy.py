@@ -0,0 +1,25 @@
+import sys
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from src.lazy import lazy_import
+
+
+def test_module_is_imported_once_on_first_access(tmp_path, monkeypatch):
+    (tmp_path / "slow_module.py").write_text(
+        "import time\nCALLS = []\nCALLS.append(1)\ntime.sleep(0.2)\nVALUE = 42\n"
+    )
+    monkeypatch.syspath_prepend(str(tmp_path))
+    module = lazy_import("slow_module")
+    assert "slow_module" not in sys.modules
+
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        values = list(pool.map(lambda _: module.VALUE, range(8)))
+    assert values == [42] * 8
+    assert module.CALLS == [1]
+
+
+def test_missing_module_raises():
+    with pytest.raises(ModuleNotFoundError):
+        lazy_import("no_such_module_anywhere")
@@ -0,0 +1,33 @@
+import numpy as np
+import pandas as pd
+
+from src.forecast import _fit_rows, fit_log_linear
+from src.partition import MP_CONTEXT, run_partitioned
+
+
+def _cumulative(frame: pd.DataFrame) -> pd.DataFrame:
+    frame["total"] = frame.groupby("country_region")["value"].cumsum()
+    return frame
+
+
+def test_pools_spawn_workers():
+    assert MP_CONTEXT.get_start_method() == "spawn"
+
+
+def test_partitioned_result_matches_in_process_result():
+    frame = pd.DataFrame(
+        {
+            "country_region": np.repeat(["A", "B", "C", "D"], 5),
+            "value": np.arange(20.0),
+        }
+    )
+    expected = _cumulative(frame.copy())
+    result = run_partitioned(frame, _cumulative, workers=2, min_rows=0)
+    pd.testing.assert_frame_equal(result, expected)
+
+
+def test_forecast_fit_in_pool_matches_in_process_fit(monkeypatch):
+    matrix = np.exp(np.linspace(0, 3, 30))[None, :] * np.arange(1, 5)[:, None]
+    monkeypatch.setattr("src.forecast.PARALLEL_REGIONS", 0)
+    for result, expected in zip(_fit_rows(matrix, workers=2), fit_log_linear(matrix)):
+        np.testing.assert_allclose(result, expected)
@@ -0,0 +1,35 @@
+import numpy as np
+import pandas as pd
+
+from src.ranking import DEPTH, Leaderboard
+
+
+def _source(count: int) -> pd.DataFrame:
+    rng = np.random.default_rng(0)
+    confirmed = rng.permutation(count).astype(float)
+    confirmed[3] = np.nan
+    return pd.DataFrame(
+        {
+            "country_region": [f"Country {i}" for i in range(count)],
+            "confirmed": confirmed,
+        }
+    )
+
+
+def test_top_matches_full_sort():
+    source = _source(3 * DEPTH)
+    board = Leaderboard(source, metrics=["confirmed"])
+    expected = source.sort_values("confirmed", ascending=False)["country_region"]
+    assert list(board.top("confirmed", 10)) == list(expected[:10])
+    # Deeper than the index was built for, with the missing value last
+    assert list(board.top("confirmed", len(source))) == list(expected)
+    assert board.top("confirmed", len(source))[-1] == "Country 3"
+
+
+def test_rank_counts_larger_values():
+    source = pd.DataFrame(
+        {"country_region": ["A", "B", "C", "D"], "confirmed": [5.0, 9.0, 5.0, np.nan]}
+    )
+    board = Leaderboard(source, metrics=["confirmed"])
+    assert [board.rank("confirmed", c) for c in "ABCD"] == [2, 1, 2, 4]
+    assert list(board.top("confirmed", 2)) == ["B", "A"]
@@ -0,0 +1,63 @@
+import numpy as np
+import pandas as pd
+
+from src.rollup import OTHER_CONTINENT, RollupCube
+
+
+def _time_source(continents: dict, days: int = 40) -> pd.DataFrame:
+    frames = []
+    for i, (country, continent) in enumerate(continents.items()):
+        delta = np.full(days, i + 1.0)
+        frames.append(
+            pd.DataFrame(
+                {
+                    "country_region": country,
+                    "continent_name": continent,
+                    "date": pd.date_range("2020-03-01", periods=days),
+                    "confirmed": delta.cumsum(),
+                    "deaths": 0.0,
+                    "recovered": 0.0,
+                    "population": 1000.0 * (i + 1),
+                    "delta_confirmed": delta,
+                    "delta_deaths": 0.0,
+                }
+            )
+        )
+    return pd.concat(frames, ignore_index=True)
+
+
+def _world_source(time_source: pd.DataFrame) -> pd.DataFrame:
+    latest = time_source[time_source["date"] == time_source["date"].max()]
+    return latest.assign(active=latest["confirmed"])
+
+
+def test_grains_take_last_stock_and_sum_flows():
+    time_source = _time_source({"Norway": "Europe", "Sweden": "Europe"})
+    cube = RollupCube(time_source, _world_source(time_source))
+
+    daily = cube.get("day", "world")
+    assert len(daily) == 40
+    np.testing.assert_allclose(daily["confirmed"], 3 * np.arange(1, 41))
+
+    monthly = cube.get("month", "country")
+    norway = monthly[monthly["country_region"] == "Norway"]
+    assert list(norway["date"]) == list(pd.to_datetime(["2020-03-01", "2020-04-01"]))
+    assert list(norway["confirmed"]) == [31, 40]
+    assert list(norway["delta_confirmed"]) == [31, 9]
+
+    weekly = cube.get("week", "continent")
+    assert weekly["delta_confirmed"].sum() == 3 * 40
+    assert cube.snapshot["confirmed"] == 3 * 40
+    assert cube.snapshot["population"] == 3000
+
+
+def test_countries_without_continent_are_kept():
+    time_source = _time_source({"Norway": "Europe", "Kosovo": np.nan})
+    cube = RollupCube(time_source, _world_source(time_source))
+
+    world = cube.get("week", "world")
+    continents = cube.get("week", "continent")
+    assert set(continents["continent_name"]) == {"Europe", OTHER_CONTINENT}
+    totals = continents.groupby("date")[["confirmed", "delta_confirmed"]].sum()
+    pd.testing.assert_frame_equal(totals, world.set_index("date")[totals.columns])
+    assert len(cube.get("day", "country")) == 2 * 40
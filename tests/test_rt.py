@@ -0,0 +1,64 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.rt import (
+    SERIAL_INTERVAL_DAYS,
+    estimate_rt,
+    get_time_series_rt,
+    infectiousness,
+    serial_interval,
+)
+
+
+def test_serial_interval_is_distribution_with_given_mean():
+    weights = serial_interval()
+    assert weights[0] == 0
+    assert weights.sum() == pytest.approx(1)
+    # Day s is the interval (s - 1, s], evaluated at its midpoint
+    midpoints = np.arange(len(weights)) - 0.5
+    assert (weights * midpoints).sum() == pytest.approx(4.7, abs=0.1)
+
+
+def test_infectiousness_of_single_case_is_serial_interval():
+    weights = serial_interval()
+    incidence = np.zeros((1, 30))
+    incidence[0, 2] = 1
+    total = infectiousness(incidence, weights)
+    np.testing.assert_allclose(total[0, 3 : 3 + 20], weights[1:21])
+    assert (total[0, :3] == 0).all()
+
+
+def test_rt_of_constant_and_exponential_incidence():
+    days = np.arange(100)
+    growth = 0.1
+    incidence = np.vstack([np.full(100, 1000.0), 100 * np.exp(growth * days)])
+    rt_mean, rt_std = estimate_rt(incidence)
+
+    # Euler-Lotka equation: R = 1 / sum of w(s) * exp(-r * s)
+    weights = serial_interval()
+    expected = 1 / (weights * np.exp(-growth * np.arange(len(weights)))).sum()
+    late = slice(SERIAL_INTERVAL_DAYS + 7, None)
+    np.testing.assert_allclose(rt_mean[0, late], 1, rtol=1e-3)
+    np.testing.assert_allclose(rt_mean[1, late], expected, rtol=1e-3)
+    assert (rt_std[:, late] < 0.05).all()
+    assert np.isnan(rt_mean[:, :6]).all()
+
+
+def test_rt_needs_minimum_cases():
+    rt_mean, _ = estimate_rt(np.ones((1, 60)))
+    assert np.isnan(rt_mean).all()
+
+
+def test_time_series_rt_is_aligned_with_rows():
+    days = 60
+    time_source = pd.DataFrame(
+        {
+            "country_region": np.repeat(["Sweden", "Norway"], days),
+            "date": np.tile(pd.date_range("2020-03-01", periods=days), 2),
+            "delta_confirmed": np.r_[np.full(days, 1000.0), np.ones(days)],
+        }
+    )
+    rt, _ = get_time_series_rt(time_source)
+    assert rt[days - 1] == pytest.approx(1, rel=1e-3)
+    assert np.isnan(rt[days:]).all()
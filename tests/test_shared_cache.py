@@ -0,0 +1,39 @@
+import os
+import time
+
+from src.cache import LocalFileCache
+
+
+def test_values_are_keyed_by_data_and_code_version(tmp_path):
+    cache = LocalFileCache(tmp_path, code_version="a")
+    cache.set("v1", "key", 1)
+    assert cache.get("v1", "key") == 1
+    assert cache.get("v2", "key") is None
+    assert LocalFileCache(tmp_path, code_version="b").get("v1", "key") is None
+
+
+def test_set_version_keeps_recent_versions_of_other_replicas(tmp_path):
+    cache = LocalFileCache(tmp_path, retention=60)
+    cache.set("old", "key", 1)
+    cache.set("new", "key", 2)
+    cache.set_version("new")
+    assert cache.get("old", "key") == 1
+
+    old = cache._file("old", "key").parent
+    os.utime(old, (time.time() - 120, time.time() - 120))
+    cache.set_version("new")
+    assert cache.get("old", "key") is None
+    assert cache.get("new", "key") == 2
+
+
+def test_write_errors_are_misses_without_leaking_files(tmp_path):
+    path = tmp_path / "file"
+    path.write_text("not a directory")
+    cache = LocalFileCache(path)
+    cache.set("v1", "key", 1)
+    assert cache.get("v1", "key") is None
+
+    cache = LocalFileCache(tmp_path / "cache")
+    cache.set("v1", "key", lambda: None)
+    assert cache.get("v1", "key") is None
+    assert not list((tmp_path / "cache").glob("*/*.tmp"))
@@ -0,0 +1,61 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.similarity import MIN_OVERLAP, SimilarityIndex
+
+
+def _time_source(curves: dict, population: float = 10 ** 6) -> pd.DataFrame:
+    """Return time series of countries given as (first case date, daily cases)."""
+    frames = []
+    for country, (start, cases) in curves.items():
+        frames.append(
+            pd.DataFrame(
+                {
+                    "country_region": country,
+                    "date": pd.date_range(start, periods=len(cases)),
+                    "confirmed": np.cumsum(cases),
+                    "delta_confirmed_7d": cases,
+                    "population": population,
+                }
+            )
+        )
+    return pd.concat(frames, ignore_index=True)
+
+
+def test_similarity_is_cosine_over_common_days():
+    days = np.arange(60.0)
+    rng = np.random.default_rng(0)
+    noisy = 1 + days + 20 * rng.random(60)
+    time_source = _time_source(
+        {
+            "Norway": ("2020-03-01", 1 + days),
+            # Same shape, ten times the size, starting a week later
+            "Sweden": ("2020-03-08", 10 * (1 + days)),
+            # Only 40 days of history
+            "Denmark": ("2020-03-01", noisy[:40]),
+        }
+    )
+    index = SimilarityIndex(time_source)
+    similarity = dict(zip(index.countries, index.similarities("Norway")))
+
+    assert similarity["Sweden"] == pytest.approx(1)
+    common = 1 + days[:40]
+    expected = common @ noisy[:40] / np.linalg.norm(common) / np.linalg.norm(noisy[:40])
+    assert similarity["Denmark"] == pytest.approx(expected)
+
+
+def test_nearest_excludes_self_and_short_curves():
+    days = np.arange(60.0)
+    time_source = _time_source(
+        {
+            "Norway": ("2020-03-01", 1 + days),
+            "Sweden": ("2020-03-01", 2 + days),
+            "Finland": ("2020-03-01", np.exp(days / 10)),
+            "Iceland": ("2020-03-01", 1 + days[: MIN_OVERLAP - 1]),
+        }
+    )
+    index = SimilarityIndex(time_source)
+    assert list(index.nearest("Norway", k=3)) == ["Sweden", "Finland"]
+    assert len(index.nearest("Iceland")) == 0
+    assert len(index.nearest("Atlantis")) == 0
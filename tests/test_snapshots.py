@@ -0,0 +1,67 @@
+import json
+
+import pytest
+
+from src.snapshots import diff_snapshots, load_manifest, restore_snapshot, save_snapshot
+
+
+def _lines(count: int = 20_000, changed: int = None) -> str:
+    return "".join(
+        f"Country {i % 200},{i},{'revised' if i == changed else i * 7}\n"
+        for i in range(1, count + 1)
+    )
+
+
+def test_restored_files_equal_saved_files(tmp_path):
+    source = tmp_path / "cases_time.csv"
+    source.write_text(_lines())
+    store = tmp_path / "store"
+    manifest = save_snapshot("a", [source], store)
+    assert len(manifest["files"]["cases_time.csv"]["chunks"]) > 10
+
+    target = tmp_path / "restored"
+    assert restore_snapshot("a", target, store=store) == [target / "cases_time.csv"]
+    assert (target / "cases_time.csv").read_text() == source.read_text()
+
+
+def test_corrupt_snapshot_is_not_restored(tmp_path):
+    source = tmp_path / "cases_time.csv"
+    source.write_text(_lines(1_000))
+    store = tmp_path / "store"
+    save_snapshot("a", [source], store)
+    manifest = load_manifest("a", store)
+    manifest["files"]["cases_time.csv"]["sha256"] = "0" * 64
+    (store / "manifests" / "a.json").write_text(json.dumps(manifest))
+    with pytest.raises(ValueError):
+        restore_snapshot("a", tmp_path / "restored", store=store)
+
+
+def test_changed_line_only_stores_its_chunk(tmp_path):
+    source = tmp_path / "cases_time.csv"
+    store = tmp_path / "store"
+    source.write_text(_lines())
+    first = save_snapshot("a", [source], store)
+    source.write_text(_lines(changed=10_000))
+    second = save_snapshot("b", [source], store)
+
+    before = first["files"][source.name]["chunks"]
+    after = second["files"][source.name]["chunks"]
+    assert second["written"]["chunks"] == 1
+    assert len(after) == len(before)
+    assert sum(a != b for a, b in zip(before, after)) == 1
+
+
+def test_diff_numbers_lines_from_start_of_file(tmp_path):
+    source = tmp_path / "cases_time.csv"
+    store = tmp_path / "store"
+    source.write_text(_lines())
+    save_snapshot("a", [source], store)
+    source.write_text(_lines(changed=10_000))
+    save_snapshot("b", [source], store)
+
+    assert list(diff_snapshots("a", "b", store)) == [
+        "--- a/cases_time.csv\n+++ b/cases_time.csv\n",
+        "@@ -10000 +10000 @@\n",
+        "-Country 0,10000,70000\n",
+        "+Country 0,10000,revised\n",
+    ]
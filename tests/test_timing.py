@@ -0,0 +1,57 @@
+import pytest
+
+from src.cache import CACHE
+from src.lazy import lazy_import
+from src.timing import get_timings, memoize, reset_timings, submit, timed
+
+
+def test_memoized_sections_are_reused_and_evicted_with_data_version():
+    calls = []
+
+    @memoize
+    def section(version: str, country: str) -> str:
+        calls.append(country)
+        return f"{country} at {version}"
+
+    CACHE.set_version("v1")
+    reset_timings()
+    assert section("v1", "Norway") == section("v1", "Norway") == "Norway at v1"
+    assert calls == ["Norway"]
+    assert [status for *_, status in get_timings()] == ["computed", "reused"]
+
+    CACHE.set_version("v2")
+    section("v1", "Norway")
+    assert calls == ["Norway", "Norway"]
+
+
+def test_timed_records_failing_block():
+    reset_timings()
+    with pytest.raises(ValueError):
+        with timed("failing"):
+            raise ValueError
+    assert [name for name, *_ in get_timings()] == ["failing"]
+
+
+def test_section_stored_just_before_flight_is_not_recomputed(monkeypatch):
+    calls = []
+
+    @memoize
+    def section(country: str) -> str:
+        calls.append(country)
+        return country
+
+    section("Norway")
+    # A caller missing the cache just as the leader stores the result
+    monkeypatch.setattr(CACHE, "get", lambda key, default=None: default)
+    assert section("Norway") == "Norway"
+    assert calls == ["Norway"]
+
+
+def test_submit_imports_lazy_modules_before_running_in_pool(tmp_path, monkeypatch):
+    (tmp_path / "lazy_chart_module.py").write_text(
+        "import threading\n" "THREAD = threading.current_thread().name\n"
+    )
+    monkeypatch.syspath_prepend(str(tmp_path))
+    module = lazy_import("lazy_chart_module")
+
+    assert submit(lambda: module.THREAD).result() == "MainThread"